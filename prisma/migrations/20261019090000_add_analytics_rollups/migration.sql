@@ -0,0 +1,32 @@
+-- CreateEnum
+CREATE TYPE "RollupGranularity" AS ENUM ('HOURLY', 'DAILY');
+
+-- CreateTable
+CREATE TABLE "analytics_rollups" (
+    "granularity" "RollupGranularity" NOT NULL,
+    "periodStart" TIMESTAMP(3) NOT NULL,
+    "type" "AnalyticsType" NOT NULL,
+    "page" TEXT NOT NULL DEFAULT '',
+    "events" INTEGER NOT NULL DEFAULT 0,
+    "uniqueSessions" INTEGER,
+    "sessionSketch" BYTEA,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "analytics_rollups_pkey" PRIMARY KEY ("granularity","periodStart","type","page")
+);
+
+-- CreateTable
+CREATE TABLE "job_watermarks" (
+    "job" TEXT NOT NULL,
+    "lastCreatedAt" TIMESTAMP(3) NOT NULL,
+    "lastId" TEXT NOT NULL,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "job_watermarks_pkey" PRIMARY KEY ("job")
+);
+
+-- CreateIndex
+CREATE INDEX "analytics_createdAt_id_idx" ON "analytics"("createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "analytics_rollups_granularity_type_periodStart_idx" ON "analytics_rollups"("granularity", "type", "periodStart");
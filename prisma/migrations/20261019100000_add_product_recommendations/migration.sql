@@ -0,0 +1,34 @@
+-- CreateTable
+CREATE TABLE "product_cooccurrence" (
+    "productA" TEXT NOT NULL,
+    "productB" TEXT NOT NULL,
+    "orders" INTEGER NOT NULL DEFAULT 0,
+
+    CONSTRAINT "product_cooccurrence_pkey" PRIMARY KEY ("productA","productB")
+);
+
+-- CreateTable
+CREATE TABLE "product_recommendations" (
+    "productId" TEXT NOT NULL,
+    "boughtTogether" TEXT[],
+    "boughtTogetherScores" DOUBLE PRECISION[],
+    "pairedRecipes" TEXT[],
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "product_recommendations_pkey" PRIMARY KEY ("productId")
+);
+
+-- CreateTable
+CREATE TABLE "recipe_recommendations" (
+    "recipeId" TEXT NOT NULL,
+    "pairedProducts" TEXT[],
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "recipe_recommendations_pkey" PRIMARY KEY ("recipeId")
+);
+
+-- CreateIndex
+CREATE INDEX "product_cooccurrence_productB_idx" ON "product_cooccurrence"("productB");
+
+-- AddForeignKey
+ALTER TABLE "product_recommendations" ADD CONSTRAINT "product_recommendations_productId_fkey" FOREIGN KEY ("productId") REFERENCES "products"("id") ON DELETE CASCADE ON UPDATE CASCADE;
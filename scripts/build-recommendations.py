@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Precompute "frequently bought together" and recipe/salsa pairing lists
+
+Bought-together: every order contributes +1 to each pair of distinct products
+in it (and to each product's own count) in product_cooccurrence. Similarity
+is cosine over those counts, orders(a, b) / sqrt(orders(a) * orders(b)), and
+the top-k active neighbors per product land in product_recommendations.
+
+Only orders the admin dashboard counts as sales are used: status not
+CANCELLED/REFUNDED and paymentStatus PAID or PARTIALLY_REFUNDED.
+
+Incremental runs only read orders newer than the stored watermark, add their
+pair counts and recompute neighbor lists for the products in those orders.
+Orders are read once they are an hour old, so checkout payments have
+settled. An order's status can still change after it has been counted (a
+refund, or an invoice paid days later); incremental runs never revisit it.
+Scores of untouched products also drift slightly as their neighbors sell
+more. Schedule --full nightly to rebuild from the current statuses, e.g.:
+
+    15 * * * *  python3 scripts/build-recommendations.py
+    45 3 * * *  python3 scripts/build-recommendations.py --full
+
+Recipe pairings: recipes and products that share tags are scored by the sum
+of the shared tags' IDF weights, so rare tags count more than broad ones.
+They are small and recomputed in full on every run.
+
+Usage:
+    python3 scripts/build-recommendations.py          # incremental update
+    python3 scripts/build-recommendations.py --full   # rebuild from all orders
+"""
+
+import argparse
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pgutil import (
+    copy_block,
+    execute,
+    fetch_rows,
+    keyset_after,
+    literal,
+    load_watermark,
+    parse_timestamp,
+    sales_order_filter,
+    stream_rows,
+    utc_now,
+    watermark_statement,
+)
+
+JOB_NAME = 'build-recommendations'
+
+# Orders newer than this are left for the next run: their payment may not have
+# settled yet, and rows still being committed with a slightly older createdAt
+# are not skipped by the watermark
+SETTLE_LAG = timedelta(hours=1)
+
+Neighbors = List[Tuple[str, float]]
+
+def count_order_pairs(
+    since: Optional[datetime], since_id: str, until: datetime, batch_size: int
+) -> Tuple[Counter, Optional[Tuple[datetime, str]], int]:
+    """Stream order items after the watermark and count product pairs per order"""
+    query = (
+        'SELECT o."id", o."createdAt", oi."productId" FROM orders o '
+        'JOIN order_items oi ON oi."orderId" = o."id" '
+        f'WHERE {keyset_after(since, since_id, "o")} AND o."createdAt" < {literal(until)} '
+        f'AND {sales_order_filter("o")} '
+        'ORDER BY o."createdAt", o."id"'
+    )
+
+    pairs: Counter = Counter()
+    last = None
+    orders = 0
+    current_id: Optional[str] = None
+    basket: Set[str] = set()
+
+    def flush():
+        items = sorted(basket)
+        for product_id in items:
+            pairs[(product_id, product_id)] += 1
+        for pair in combinations(items, 2):
+            pairs[pair] += 1
+
+    # Rows arrive grouped by order, so a basket is complete once the id changes
+    for batch in stream_rows(query, batch_size):
+        for order_id, created_at, product_id in batch:
+            if order_id != current_id:
+                if current_id is not None:
+                    flush()
+                current_id = order_id
+                basket = set()
+                orders += 1
+                last = (parse_timestamp(created_at), order_id)
+            basket.add(product_id)
+    if current_id is not None:
+        flush()
+
+    return pairs, last, orders
+
+def load_cooccurrence(products: Set[str]) -> Counter:
+    """Stored pair counts touching the given products, plus their neighbors' own counts"""
+    if not products:
+        return Counter()
+
+    ids = literal(sorted(products))
+    counts: Counter = Counter()
+    for a, b, n in fetch_rows(
+        'SELECT "productA", "productB", "orders" FROM product_cooccurrence '
+        f'WHERE "productA" = ANY({ids}) OR "productB" = ANY({ids})'
+    ):
+        counts[(a, b)] = int(n)
+
+    neighbors = {p for pair in counts for p in pair} - products
+    if neighbors:
+        for a, b, n in fetch_rows(
+            'SELECT "productA", "productB", "orders" FROM product_cooccurrence '
+            f'WHERE "productA" = "productB" AND "productA" = ANY({literal(sorted(neighbors))})'
+        ):
+            counts[(a, b)] = int(n)
+
+    return counts
+
+def top_neighbors(
+    counts: Counter, products: Iterable[str], active: Set[str], k: int, min_support: int
+) -> Dict[str, Neighbors]:
+    """Cosine top-k per product from sparse pair counts"""
+    totals = {a: n for (a, b), n in counts.items() if a == b}
+    adjacency: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    for (a, b), n in counts.items():
+        if a != b and n >= min_support:
+            adjacency[a].append((b, n))
+            adjacency[b].append((a, n))
+
+    result: Dict[str, Neighbors] = {}
+    for product_id in products:
+        own = totals.get(product_id, 0)
+        candidates = (
+            (other, n / math.sqrt(own * totals[other]))
+            for other, n in adjacency.get(product_id, [])
+            if other in active and totals.get(other) and own
+        )
+        result[product_id] = heapq.nlargest(k, candidates, key=lambda item: item[1])
+    return result
+
+def recipe_pairings(k: int) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Score recipe/product pairs by IDF-weighted shared tags"""
+    tag_products: Dict[str, List[str]] = defaultdict(list)
+    for product_id, tag_id in fetch_rows(
+        'SELECT pt."productId", pt."tagId" FROM product_tags pt '
+        'JOIN products p ON p."id" = pt."productId" WHERE p."isActive"'
+    ):
+        tag_products[tag_id].append(product_id)
+
+    tag_recipes: Dict[str, List[str]] = defaultdict(list)
+    for recipe_id, tag_id in fetch_rows('SELECT "recipeId", "tagId" FROM recipe_tags'):
+        tag_recipes[tag_id].append(recipe_id)
+
+    tagged = len({p for ps in tag_products.values() for p in ps}) + len(
+        {r for rs in tag_recipes.values() for r in rs}
+    )
+
+    scores: Counter = Counter()
+    for tag_id, recipes in tag_recipes.items():
+        products = tag_products.get(tag_id)
+        if not products:
+            continue
+        weight = math.log(1 + tagged / (len(products) + len(recipes)))
+        for recipe_id in recipes:
+            for product_id in products:
+                scores[(recipe_id, product_id)] += weight
+
+    by_recipe: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+    by_product: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+    for (recipe_id, product_id), score in scores.items():
+        by_recipe[recipe_id].append((product_id, score))
+        by_product[product_id].append((recipe_id, score))
+
+    def best(entries: List[Tuple[str, float]]) -> List[str]:
+        # Ties broken by id so reruns produce identical lists
+        return [i for i, _ in heapq.nlargest(k, entries, key=lambda item: (item[1], item[0]))]
+
+    return (
+        {product_id: best(entries) for product_id, entries in by_product.items()},
+        {recipe_id: best(entries) for recipe_id, entries in by_recipe.items()},
+    )
+
+def build_script(
+    pairs: Counter,
+    bought_together: Dict[str, Neighbors],
+    product_recipes: Dict[str, List[str]],
+    recipe_products: Dict[str, List[str]],
+    last: Optional[Tuple[datetime, str]],
+    full: bool,
+) -> str:
+    script = ''
+
+    if full:
+        script += 'TRUNCATE product_cooccurrence;\n'
+        script += 'UPDATE product_recommendations SET "boughtTogether" = \'{}\', "boughtTogetherScores" = \'{}\';\n'
+    if pairs:
+        script += (
+            'CREATE TEMP TABLE cooccurrence_batch (LIKE product_cooccurrence) ON COMMIT DROP;\n'
+            + copy_block(
+                'cooccurrence_batch',
+                ['productA', 'productB', 'orders'],
+                ([a, b, n] for (a, b), n in pairs.items()),
+            )
+            + 'INSERT INTO product_cooccurrence SELECT * FROM cooccurrence_batch\n'
+            'ON CONFLICT ("productA", "productB") DO UPDATE SET\n'
+            '  "orders" = product_cooccurrence."orders" + EXCLUDED."orders";\n'
+        )
+
+    script += (
+        'CREATE TEMP TABLE recommendation_batch (LIKE product_recommendations) ON COMMIT DROP;\n'
+        'ALTER TABLE recommendation_batch ALTER COLUMN "updatedAt" SET DEFAULT CURRENT_TIMESTAMP;\n'
+    )
+    if bought_together:
+        script += (
+            copy_block(
+                'recommendation_batch',
+                ['productId', 'boughtTogether', 'boughtTogetherScores', 'pairedRecipes'],
+                (
+                    [product_id, [n for n, _ in neighbors], [round(s, 6) for _, s in neighbors], []]
+                    for product_id, neighbors in bought_together.items()
+                ),
+            )
+            + 'INSERT INTO product_recommendations SELECT * FROM recommendation_batch\n'
+            'ON CONFLICT ("productId") DO UPDATE SET\n'
+            '  "boughtTogether" = EXCLUDED."boughtTogether",\n'
+            '  "boughtTogetherScores" = EXCLUDED."boughtTogetherScores",\n'
+            '  "updatedAt" = EXCLUDED."updatedAt";\n'
+            'TRUNCATE recommendation_batch;\n'
+        )
+
+    script += 'UPDATE product_recommendations SET "pairedRecipes" = \'{}\';\n'
+    if product_recipes:
+        script += (
+            copy_block(
+                'recommendation_batch',
+                ['productId', 'boughtTogether', 'boughtTogetherScores', 'pairedRecipes'],
+                ([product_id, [], [], recipes] for product_id, recipes in product_recipes.items()),
+            )
+            + 'INSERT INTO product_recommendations SELECT * FROM recommendation_batch\n'
+            'ON CONFLICT ("productId") DO UPDATE SET\n'
+            '  "pairedRecipes" = EXCLUDED."pairedRecipes",\n'
+            '  "updatedAt" = EXCLUDED."updatedAt";\n'
+        )
+
+    script += 'DELETE FROM recipe_recommendations;\n'
+    if recipe_products:
+        script += (
+            'CREATE TEMP TABLE recipe_batch (LIKE recipe_recommendations) ON COMMIT DROP;\n'
+            'ALTER TABLE recipe_batch ALTER COLUMN "updatedAt" SET DEFAULT CURRENT_TIMESTAMP;\n'
+            + copy_block(
+                'recipe_batch',
+                ['recipeId', 'pairedProducts'],
+                ([recipe_id, products] for recipe_id, products in recipe_products.items()),
+            )
+            + 'INSERT INTO recipe_recommendations SELECT * FROM recipe_batch;\n'
+        )
+
+    if last is not None:
+        script += watermark_statement(JOB_NAME, last[0], last[1])
+    elif full:
+        script += f'DELETE FROM job_watermarks WHERE "job" = {literal(JOB_NAME)};\n'
+
+    return script
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--full', action='store_true',
+                        help='ignore the watermark and rebuild counts from every order')
+    parser.add_argument('--top', type=int, default=8, help='neighbors kept per product/recipe')
+    parser.add_argument('--min-support', type=int, default=1,
+                        help='minimum orders a pair must share to be recommended')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='rows fetched per streamed batch')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("BUILDING PRODUCT RECOMMENDATIONS")
+    print("=" * 70)
+
+    since, since_id = (None, '') if args.full else load_watermark(JOB_NAME)
+    print(f"\nWatermark: {since.isoformat() if since else 'none (full rebuild)'}")
+
+    pairs, last, orders = count_order_pairs(since, since_id, utc_now() - SETTLE_LAG, args.batch_size)
+    touched = {a for a, b in pairs if a == b}
+    print(f"✓ Counted {len(pairs)} product pairs from {orders} new orders")
+
+    active = {row[0] for row in fetch_rows('SELECT "id" FROM products WHERE "isActive"')}
+
+    counts = Counter() if args.full else load_cooccurrence(touched)
+    counts.update(pairs)
+    bought_together = top_neighbors(counts, touched, active, args.top, args.min_support)
+    print(f"✓ Recomputed bought-together lists for {len(bought_together)} products")
+
+    product_recipes, recipe_products = recipe_pairings(args.top)
+    print(f"✓ Paired {len(recipe_products)} recipes with {len(product_recipes)} products")
+
+    execute(build_script(pairs, bought_together, product_recipes, recipe_products, last, args.full))
+
+    print("\n✅ Recommendations written")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
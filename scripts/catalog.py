@@ -0,0 +1,112 @@
+"""
+Shared catalog helpers for the product scripts in scripts/
+
+Scraped names come straight out of HTML attributes (e.g. "Roasted Garlic &amp;
+Olives"), so every script cleans them with clean_name() before using them as
+keys. SKUs are assigned once per scraped product id and persisted in
+product-id-map.json, so they no longer depend on the scrape order. Only
+reconcile-products.py, which knows the SKUs already in the database, adds
+entries to the map; the seed generators only read it.
+"""
+
+import html
+import json
+import os
+import re
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ID_MAP_PATH = os.path.join(REPO_ROOT, 'product-id-map.json')
+
+SKU_PREFIXES = {
+    'MILD': 'JMS-MILD',
+    'MEDIUM': 'JMS-MED',
+    'HOT': 'JMS-HOT',
+    'EXTRA_HOT': 'JMS-XHOT',
+    'FRUIT': 'JMS-FRUIT',
+}
+
+# Words that appear in most listings and say nothing about which salsa it is
+NAME_STOPWORDS = {'salsa', 'jose', 'madrid', 'the', 'of', 'with', 'and'}
+
+# Placeholder copy the seed generators fall back to when a product has no description
+FALLBACK_DESCRIPTIONS = [
+    'Delicious {name} salsa made with premium ingredients.',  # generate-seed-data.py
+    'Delicious {name} salsa',                                  # create-complete-seed.py
+]
+
+_SKU_PATTERN = re.compile(r'^(.*)-(\d+)$')
+
+_BUNDLE_PATTERN = re.compile(
+    r'^choose\b|\b(choose|pick|any)[- ]?\d+\b|\b\d+[- ]?(pack|jar)s?\b|\bgift (box|set)\b|\bvariety\b|\bbundle\b',
+    re.IGNORECASE,
+)
+
+def clean_name(name: str) -> str:
+    """Display name with HTML entities decoded and whitespace collapsed"""
+    return re.sub(r'\s+', ' ', html.unescape(name)).strip()
+
+def normalize_name(name: str) -> str:
+    """Matching key for a product name: lowercase words without punctuation or filler words"""
+    text = clean_name(name).casefold().replace('&', ' and ')
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    # "X X Hot" and "XX Hot" are the same product
+    text = re.sub(r'\b([a-z]) (?=[a-z]\b)', r'\1', text)
+    return ' '.join(word for word in text.split() if word not in NAME_STOPWORDS)
+
+def is_bundle(product: Dict) -> bool:
+    """Gift boxes, "Choose-N" and multi-jar packs are not individual jars"""
+    return bool(_BUNDLE_PATTERN.search(clean_name(product['name'])))
+
+class SkuRegistry:
+    """Persistent scraped-product-id -> SKU map"""
+
+    def __init__(self, path: str = ID_MAP_PATH):
+        self.path = path
+        self.skus: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.skus = json.load(f)
+        self._next: Dict[str, int] = {}
+        for sku in self.skus.values():
+            self.reserve(sku)
+
+    def reserve(self, sku: str) -> None:
+        """Mark a SKU (e.g. one already in the database) as taken"""
+        match = _SKU_PATTERN.match(sku)
+        if match:
+            prefix, number = match.group(1), int(match.group(2))
+            self._next[prefix] = max(self._next.get(prefix, 1), number + 1)
+
+    def get(self, source_id: str) -> Optional[str]:
+        return self.skus.get(str(source_id))
+
+    def assign(self, source_id: str, sku: str) -> None:
+        self.skus[str(source_id)] = sku
+        self.reserve(sku)
+
+    def new_sku(self, heat_level: str) -> str:
+        """Next free SKU for a heat level; reserved for this run but not mapped to an id"""
+        prefix = SKU_PREFIXES.get(heat_level, SKU_PREFIXES['FRUIT'])
+        sku = f"{prefix}-{str(self._next.get(prefix, 1)).zfill(3)}"
+        self.reserve(sku)
+        return sku
+
+    def sku_or_provisional(self, source_id: str, heat_level: str) -> str:
+        """Mapped SKU for a scraped product, or a provisional one derived from its id
+
+        Provisional SKUs ("JMS-MILD-NEW-95") are never written to the map; run
+        reconcile-products.py to assign real ones.
+        """
+        sku = self.get(source_id)
+        if sku is None:
+            prefix = SKU_PREFIXES.get(heat_level, SKU_PREFIXES['FRUIT'])
+            sku = f"{prefix}-NEW-{source_id}"
+        return sku
+
+    def save(self) -> None:
+        with open(self.path, 'w') as f:
+            # Numeric ids sort numerically ("95" before "100")
+            ordered = sorted(self.skus.items(), key=lambda item: (len(item[0]), item[0]))
+            json.dump(dict(ordered), f, indent=2)
+            f.write('\n')
@@ -5,12 +5,22 @@ Create complete seed.ts file with all correct product data from scraped JSON
 
 import json
 
+from catalog import FALLBACK_DESCRIPTIONS, SkuRegistry, clean_name, is_bundle
+from dedupe import dedupe_records
+
 # Load scraped products
 with open('/Users/jordanlang/Repos/josemadridsalsa/scraped-products.json', 'r') as f:
     products = json.load(f)
 
 # Filter out bundle products
-individual_products = [p for p in products if not p['name'].startswith('Choose-')]
+individual_products = [p for p in products if not is_bundle(p)]
+
+# Keep one listing per near-duplicate cluster
+dedupe = dedupe_records(individual_products)
+for cluster in dedupe['listing_clusters']:
+    dropped = ', '.join(individual_products[i]['slug'] for i in cluster['duplicates'])
+    print(f"Duplicate listing: keeping {individual_products[cluster['canonical']]['slug']}, dropping {dropped}")
+individual_products = [individual_products[i] for i in dedupe['canonical']]
 
 # Image mappings
 image_map = {
@@ -82,31 +92,23 @@ category_map = {
 }
 
 # Generate product entries
+registry = SkuRegistry()
 product_entries = []
-for idx, p in enumerate(individual_products):
-    name = p['name'].replace("'", "\\'").replace('&', '&amp;')
+for p in individual_products:
+    display_name = clean_name(p['name'])
+    name = display_name.replace("'", "\\'")
     slug = p['slug']
-    desc = descriptions.get(p['name'], f"Delicious {p['name']} salsa").replace("'", "\\'")
+    desc = descriptions.get(display_name, FALLBACK_DESCRIPTIONS[1].format(name=display_name)).replace("'", "\\'")
     heat = p['heat_level']
     category = category_map[heat]
     image = f"/images/products/{image_map.get(slug, slug + '.jpg')}"
     
-    # SKU generation
-    if heat == 'MILD':
-        sku_prefix = 'JMS-MILD'
-    elif heat == 'MEDIUM':
-        sku_prefix = 'JMS-MED'
-    elif heat == 'HOT':
-        sku_prefix = 'JMS-HOT'
-    elif heat == 'EXTRA_HOT':
-        sku_prefix = 'JMS-XHOT'
-    else:
-        sku_prefix = 'JMS-FRUIT'
-    
-    sku = f"{sku_prefix}-{str(idx+1).zfill(3)}"
+    # Stable SKU per scraped product id (see product-id-map.json); the map is
+    # only written by reconcile-products.py, so unmapped ids get a provisional SKU
+    sku = registry.sku_or_provisional(p['id'], heat)
     
     # Featured products
-    featured = name in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
+    featured = display_name in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
     featured_line = '      isFeatured: true,' if featured else ''
     
     entry = f"""    {{
@@ -123,7 +125,7 @@ for idx, p in enumerate(individual_products):
 {featured_line}
       images: ['{image}'],
       featuredImage: '{image}',
-      searchKeywords: {json.dumps(name.lower().split())},
+      searchKeywords: {json.dumps(display_name.lower().split())},
     }},"""
     
     product_entries.append(entry)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Report near-duplicate listings and boilerplate descriptions in scraped catalogs
+
+Accepts one or more scraped product JSON files (e.g. one per store), or
+organized-products.json whose final full_description values are checked for
+template text, finds near-duplicate listings and boilerplate descriptions with
+MinHash/LSH (see dedupe.py) and writes dedupe-report.json with one canonical
+record per listing cluster.
+
+Usage:
+    python3 scripts/dedupe-products.py
+    python3 scripts/dedupe-products.py store-a.json store-b.json --threshold 0.75
+    python3 scripts/dedupe-products.py organized-products.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+from catalog import REPO_ROOT, clean_name, is_bundle
+from dedupe import dedupe_records, description_text
+
+SCRAPED_PATH = os.path.join(REPO_ROOT, 'scraped-products.json')
+REPORT_PATH = os.path.join(REPO_ROOT, 'dedupe-report.json')
+
+def summarize(record):
+    return {
+        'store': record['store'],
+        'id': record.get('id'),
+        'name': record['name'],
+        'slug': record.get('slug'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('inputs', nargs='*', default=[SCRAPED_PATH], help='scraped products JSON files or organized-products.json')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                        help='estimated Jaccard similarity for duplicate listings')
+    parser.add_argument('--description-threshold', type=float, default=0.8,
+                        help='estimated Jaccard similarity for boilerplate descriptions')
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("DUPLICATE LISTING REPORT")
+    print("=" * 70)
+
+    records = []
+    bundles = 0
+    for path in args.inputs:
+        store = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r') as f:
+            data = json.load(f)
+            # organized-products.json wraps the list
+            for p in data['all_products'] if isinstance(data, dict) else data:
+                if is_bundle(p):
+                    bundles += 1
+                    continue
+                records.append(dict(p, name=clean_name(p['name']), store=store))
+
+    print(f"\nLoaded {len(records)} listings from {len(args.inputs)} file(s), skipped {bundles} bundles")
+
+    started = time.time()
+    result = dedupe_records(records, args.threshold, args.description_threshold)
+    print(f"✓ Compared in {time.time() - started:.2f}s")
+
+    report = {
+        'listings': len(records),
+        'canonical': len(result['canonical']),
+        'listingClusters': [
+            {
+                'canonical': summarize(records[cluster['canonical']]),
+                'duplicates': [summarize(records[i]) for i in cluster['duplicates']],
+            }
+            for cluster in result['listing_clusters']
+        ],
+        'boilerplateDescriptions': [
+            {
+                'sample': description_text(records[members[0]]),
+                'products': [summarize(records[i]) for i in members],
+            }
+            for members in result['boilerplate_clusters']
+        ],
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nDuplicate listing clusters: {len(report['listingClusters'])}")
+    for cluster in report['listingClusters']:
+        dupes = ', '.join(d['slug'] for d in cluster['duplicates'])
+        print(f"  • {cluster['canonical']['slug']}  ←  {dupes}")
+
+    print(f"\nBoilerplate description clusters: {len(report['boilerplateDescriptions'])}")
+    for cluster in report['boilerplateDescriptions']:
+        print(f"  • {len(cluster['products'])} products: {cluster['sample'][:60]!r}")
+
+    print(f"\n✅ {report['canonical']} canonical listings of {report['listings']}")
+    print(f"Report saved to: {args.output}")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Near-duplicate detection for scraped product listings (MinHash + LSH)
+
+Two kinds of duplicates are found:
+  - listings: the same product listed more than once (re-listed items such as
+    "peach-mild-1", the same jar in several stores, "X X Hot" vs "XX Hot").
+    Compared on character 3-grams of the normalized name.
+  - boilerplate descriptions: template text shared by different products, or
+    matching one of the generators' fallback templates even once ("Delicious
+    {name} salsa made with premium ingredients."). Compared on word 3-grams
+    with filler words dropped and the product's own name masked.
+    The final full_description is used when a record has one (as in
+    organized-products.json), otherwise the scraped description.
+
+Every record gets a MinHash signature. Signatures are split into LSH bands,
+and only records that land in the same bucket for some band are compared,
+so the work grows with the number of records instead of the number of
+pairs. Within a bucket each record is checked against every cluster already
+seen there, and joins one only if it is similar to all of its members
+(complete link), so a chain of near matches never collapses into one
+cluster: "Apple Roasted Lime Medium" and "Apple Roasted Corn Medium" stay
+apart even when a third listing is close to both.
+"""
+
+import hashlib
+import operator
+import random
+import re
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from catalog import FALLBACK_DESCRIPTIONS, NAME_STOPWORDS, clean_name, normalize_name
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually share a bucket
+
+_PRIME = (1 << 61) - 1
+# Fixed seed so signatures are comparable between runs
+_rng = random.Random(20240301)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Listings that differ in heat are different products however similar the names
+HEAT_WORDS = {'mild', 'medium', 'hot', 'xx', 'x', 'extra'}
+
+Signature = Tuple[int, ...]
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def minhash(shingles: Set[str]) -> Optional[Signature]:
+    if not shingles:
+        return None
+    hashes = [_hash(s) for s in shingles]
+    return tuple(min((a * x + b) % _PRIME for x in hashes) for a, b in _PERMUTATIONS)
+
+def estimate_similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the underlying shingle sets"""
+    return sum(map(operator.eq, a, b)) / NUM_PERM
+
+def name_shingles(record: Dict[str, Any]) -> Set[str]:
+    text = f" {normalize_name(record['name'])} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def description_text(record: Dict[str, Any]) -> str:
+    return record.get('full_description') or record.get('description') or ''
+
+def description_shingles(record: Dict[str, Any], size: int = 3) -> Set[str]:
+    words = re.findall(r'[a-z0-9]+', clean_name(description_text(record)).casefold())
+    own = set(re.findall(r'[a-z0-9]+', clean_name(record['name']).casefold()))
+
+    masked: List[str] = []
+    for word in words:
+        if word in NAME_STOPWORDS:
+            continue
+        token = '{name}' if word in own else word
+        if not (token == '{name}' and masked and masked[-1] == '{name}'):
+            masked.append(token)
+
+    if len(masked) < size:
+        return {' '.join(masked)} if masked else set()
+    return {' '.join(masked[i:i + size]) for i in range(len(masked) - size + 1)}
+
+def cluster_signatures(
+    signatures: Sequence[Optional[Signature]],
+    threshold: float,
+    compatible: Optional[Callable[[int, int], bool]] = None,
+) -> List[List[int]]:
+    """Group record positions whose signatures are all pairwise at least `threshold` similar
+
+    Clusters are complete-link: two clusters merge only when every pair across
+    them is compatible and similar enough, so A~B and B~C never pulls A and C
+    together on their own.
+    """
+    rows = NUM_PERM // BANDS
+    cluster_of = list(range(len(signatures)))
+    clusters: Dict[int, List[int]] = {i: [i] for i, sig in enumerate(signatures) if sig is not None}
+
+    def joinable(a: List[int], b: List[int]) -> bool:
+        return all(
+            (compatible is None or compatible(x, y))
+            and estimate_similarity(signatures[x], signatures[y]) >= threshold
+            for x in a for y in b
+        )
+
+    for band in range(BANDS):
+        buckets: Dict[Signature, List[int]] = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            if sig is not None:
+                buckets[sig[band * rows:(band + 1) * rows]].append(i)
+
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Each record is checked against every cluster already seen in the bucket
+            seen: List[int] = []
+            for i in members:
+                for other in seen:
+                    mine = cluster_of[i]
+                    if other == mine or other not in clusters:
+                        continue
+                    if joinable(clusters[mine], clusters[other]):
+                        keep, drop = min(mine, other), max(mine, other)
+                        for j in clusters[drop]:
+                            cluster_of[j] = keep
+                        clusters[keep].extend(clusters.pop(drop))
+                if cluster_of[i] not in seen:
+                    seen.append(cluster_of[i])
+
+    return [sorted(members) for members in clusters.values() if len(members) > 1]
+
+def heat_words(record: Dict[str, Any]) -> Set[str]:
+    return set(normalize_name(record['name']).split()) & HEAT_WORDS
+
+def find_duplicate_listings(records: Sequence[Dict[str, Any]], threshold: float = 0.8) -> List[List[int]]:
+    signatures = [minhash(name_shingles(r)) for r in records]
+    heat = [heat_words(r) for r in records]
+    return cluster_signatures(signatures, threshold, lambda a, b: heat[a] == heat[b])
+
+# Stands in for {name} when a fallback template is turned into a reference record
+_TEMPLATE_NAME = 'Placeholder Product'
+
+def find_boilerplate_descriptions(
+    records: Sequence[Dict[str, Any]],
+    threshold: float = 0.8,
+    min_products: int = 2,
+    templates: Sequence[str] = FALLBACK_DESCRIPTIONS,
+) -> List[List[int]]:
+    """Clusters of near-identical descriptions shared by different products
+
+    Each template is added as a reference record, so a description matching
+    one is flagged even when a single product uses it.
+    """
+    references = [{'name': _TEMPLATE_NAME, 'description': t.format(name=_TEMPLATE_NAME)} for t in templates]
+    signatures = [minhash(description_shingles(r)) for r in list(records) + references]
+    result = []
+    for members in cluster_signatures(signatures, threshold):
+        real = [i for i in members if i < len(records)]
+        templated = len(real) < len(members)
+        if real and (templated or len({normalize_name(records[i]['name']) for i in real}) >= min_products):
+            result.append(real)
+    return result
+
+def _canonical_rank(record: Dict[str, Any], boilerplate: bool) -> Tuple:
+    source_id = str(record.get('id', ''))
+    return (
+        boilerplate or not description_text(record),             # real description first
+        bool(re.search(r'-\d+$', record.get('slug', ''))),      # "peach-mild" over "peach-mild-1"
+        -len(record.get('all_images') or []),                    # richer listing
+        (0, int(source_id)) if source_id.isdigit() else (1, source_id),  # oldest listing
+    )
+
+def pick_canonical(records: Sequence[Dict[str, Any]], members: List[int], boilerplate: Set[int]) -> int:
+    return min(members, key=lambda i: _canonical_rank(records[i], i in boilerplate))
+
+def dedupe_records(
+    records: Sequence[Dict[str, Any]],
+    listing_threshold: float = 0.8,
+    description_threshold: float = 0.8,
+) -> Dict[str, Any]:
+    """Find duplicate listings and boilerplate descriptions; choose one record per listing cluster
+
+    Everything in the result refers to positions in `records`.
+    """
+    boilerplate_clusters = find_boilerplate_descriptions(records, description_threshold)
+    boilerplate = {i for members in boilerplate_clusters for i in members}
+
+    listing_clusters = []
+    duplicates: Set[int] = set()
+    for members in find_duplicate_listings(records, listing_threshold):
+        canonical = pick_canonical(records, members, boilerplate)
+        listing_clusters.append({'canonical': canonical, 'duplicates': [i for i in members if i != canonical]})
+        duplicates.update(i for i in members if i != canonical)
+
+    return {
+        'canonical': [i for i in range(len(records)) if i not in duplicates],
+        'listing_clusters': listing_clusters,
+        'boilerplate_clusters': boilerplate_clusters,
+        'boilerplate': boilerplate,
+    }
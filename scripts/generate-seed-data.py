@@ -5,12 +5,26 @@ Generate updated seed.ts file with correct product data from scraped data
 
 import json
 
+from catalog import FALLBACK_DESCRIPTIONS, clean_name, is_bundle
+from dedupe import dedupe_records, find_boilerplate_descriptions
+
 # Load scraped products
 with open('/Users/jordanlang/Repos/josemadridsalsa/scraped-products.json', 'r') as f:
     products = json.load(f)
 
 # Filter out bundle products - only individual jars
-individual_products = [p for p in products if not p['name'].startswith('Choose-')]
+individual_products = [p for p in products if not is_bundle(p)]
+
+# Scraped names are HTML-escaped ("Roasted Garlic &amp; Olives")
+for p in individual_products:
+    p['name'] = clean_name(p['name'])
+
+# Keep one listing per near-duplicate cluster (re-listed items like peach-mild-1)
+dedupe = dedupe_records(individual_products)
+for cluster in dedupe['listing_clusters']:
+    dropped = ', '.join(individual_products[i]['slug'] for i in cluster['duplicates'])
+    print(f"Duplicate listing: keeping {individual_products[cluster['canonical']]['slug']}, dropping {dropped}")
+individual_products = [individual_products[i] for i in dedupe['canonical']]
 
 # Map local image filenames
 def get_local_image(name, slug):
@@ -78,7 +92,7 @@ def generate_description(name):
         'Cherry Chocolate Hot': 'Dark cherries and rich chocolate meet scorching heat in this gourmet salsa.',
         'Black Bean Corn Pablano': 'A hearty salsa with black beans, sweet corn, and roasted poblano peppers.',
     }
-    return descriptions.get(name, f"Delicious {name} salsa made with premium ingredients.")
+    return descriptions.get(name, FALLBACK_DESCRIPTIONS[0].format(name=name))
 
 # Organize by heat level and category
 by_heat = {
@@ -112,6 +126,14 @@ for heat, items in by_heat.items():
             print(f"      Image: {item['local_image']}")
             print(f"      Slug: {item['slug']}")
 
+# Template text shared by different products, including generate_description's fallback
+boilerplate = find_boilerplate_descriptions(individual_products)
+if boilerplate:
+    print("\nBoilerplate descriptions (replace with real copy):")
+    for members in boilerplate:
+        print(f"  • {', '.join(individual_products[i]['name'] for i in members)}")
+        print(f"      {individual_products[members[0]]['full_description']}")
+
 # Save organized data
 output_file = '/Users/jordanlang/Repos/josemadridsalsa/organized-products.json'
 with open(output_file, 'w') as f:
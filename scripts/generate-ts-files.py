@@ -5,6 +5,8 @@ Generate complete TypeScript files with correct product data
 
 import json
 
+from catalog import SkuRegistry, clean_name
+
 # Load organized products
 with open('/Users/jordanlang/Repos/josemadridsalsa/organized-products.json', 'r') as f:
     data = json.load(f)
@@ -12,6 +14,10 @@ with open('/Users/jordanlang/Repos/josemadridsalsa/organized-products.json', 'r'
 all_products = data['all_products']
 by_heat = data['by_heat_level']
 
+# Scraped names are HTML-escaped ("Roasted Garlic &amp; Olives")
+for product in all_products:
+    product['name'] = clean_name(product['name'])
+
 print(f"Loaded {len(all_products)} products")
 print("Generating TypeScript files...")
 print("=" * 70)
@@ -25,6 +31,10 @@ category_map = {
     'FRUIT': 'fruitCategory'
 }
 
+# Stable SKUs per scraped product id (see product-id-map.json); the map is only
+# written by reconcile-products.py, so unmapped ids get a provisional SKU
+registry = SkuRegistry()
+
 # Generate product entries for seed.ts
 def generate_seed_product(product, index):
     """Generate a product object for seed.ts"""
@@ -35,24 +45,10 @@ def generate_seed_product(product, index):
     image = product['local_image']
     heat_level = product['heat_level']
     category = category_map[heat_level]
-    sku_num = str(index + 1).zfill(3)
-    
-    # Determine SKU prefix
-    if heat_level == 'MILD':
-        sku_prefix = 'JMS-MILD'
-    elif heat_level == 'MEDIUM':
-        sku_prefix = 'JMS-MED'
-    elif heat_level == 'HOT':
-        sku_prefix = 'JMS-HOT'
-    elif heat_level == 'EXTRA_HOT':
-        sku_prefix = 'JMS-XHOT'
-    else:
-        sku_prefix = 'JMS-FRUIT'
-    
-    sku = f"{sku_prefix}-{sku_num}"
+    sku = registry.sku_or_provisional(product['id'], heat_level)
     
     # Mark featured products (Original Mild, Clovis Medium, Original Hot, Ghost of Clovis)
-    is_featured = name in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
+    is_featured = product['name'] in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
     
     return f"""    {{
       name: '{name}',
@@ -98,22 +94,9 @@ def generate_page_product(product, index):
     price = product['price']
     image = product['local_image']
     heat_level = product['heat_level']
+    sku = registry.sku_or_provisional(product['id'], heat_level)
     
-    sku_num = str(index + 1).zfill(3)
-    if heat_level == 'MILD':
-        sku_prefix = 'JMS-MILD'
-    elif heat_level == 'MEDIUM':
-        sku_prefix = 'JMS-MED'
-    elif heat_level == 'HOT':
-        sku_prefix = 'JMS-HOT'
-    elif heat_level == 'EXTRA_HOT':
-        sku_prefix = 'JMS-XHOT'
-    else:
-        sku_prefix = 'JMS-FRUIT'
-    
-    sku = f"{sku_prefix}-{sku_num}"
-    
-    is_featured = name in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
+    is_featured = product['name'] in ['Original Mild', 'Clovis Medium (Original Medium Chunky)', 'Original Hot', 'Ghost of Clovis', 'Mango Habanero']
     
     return f"""  {{
     id: '{index + 1}',
@@ -0,0 +1,170 @@
+"""
+Small PostgreSQL helpers shared by the offline Python jobs in scripts/
+
+Like scrape-products.py shells out to curl, these helpers shell out to psql
+so the jobs run without installing a Python database driver. Rows are
+streamed with COPY ... TO STDOUT and writes are sent as a single psql
+script, so every job write happens inside one transaction.
+"""
+
+import csv
+import io
+import os
+import subprocess
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Marker used for NULL in COPY csv output so it can be told apart from ''
+COPY_NULL = '\\N'
+
+def database_url() -> str:
+    """Return DATABASE_URL from the environment, falling back to .env"""
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        return url
+
+    env_path = os.path.join(REPO_ROOT, '.env')
+    if os.path.exists(env_path):
+        with open(env_path, 'r') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep and key.strip() == 'DATABASE_URL':
+                    return value.strip().strip('"').strip("'")
+
+    raise SystemExit('DATABASE_URL is not set (checked environment and .env)')
+
+def _psql_args(*extra: str) -> List[str]:
+    return ['psql', database_url(), '-X', '-q', '-v', 'ON_ERROR_STOP=1', *extra]
+
+def stream_rows(query: str, batch_size: int = 10000) -> Iterator[List[List[Optional[str]]]]:
+    """Stream the result of a SELECT in batches of raw string rows (NULL -> None)"""
+    copy = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    proc = subprocess.Popen(
+        _psql_args('-c', copy),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        newline='',
+    )
+
+    batch: List[List[Optional[str]]] = []
+    for row in csv.reader(proc.stdout):
+        batch.append([None if value == COPY_NULL else value for value in row])
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+    stderr = proc.stderr.read()
+    if proc.wait() != 0:
+        raise RuntimeError(f"psql query failed: {stderr.strip()}")
+
+def fetch_rows(query: str) -> List[List[Optional[str]]]:
+    """Return every row of a (small) query result"""
+    rows: List[List[Optional[str]]] = []
+    for batch in stream_rows(query):
+        rows.extend(batch)
+    return rows
+
+def execute(script: str) -> None:
+    """Run a SQL script in a single transaction"""
+    result = subprocess.run(
+        _psql_args('-1', '-f', '-'),
+        input=script,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"psql script failed: {result.stderr.strip()}")
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (list, tuple)):
+        # Postgres array literal, e.g. {"a","b"}
+        items = (str(v).replace('\\', '\\\\').replace('"', '\\"') for v in value)
+        return '{' + ','.join(f'"{item}"' for item in items) + '}'
+    return str(value)
+
+def copy_block(table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> str:
+    """Build a COPY ... FROM STDIN block (with inline data) for a psql script"""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    for row in rows:
+        writer.writerow([_copy_value(value) for value in row])
+
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    return (
+        f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}');\n"
+        f"{buf.getvalue()}\\.\n"
+    )
+
+def literal(value: Any) -> str:
+    """Render a Python value as a SQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, datetime):
+        return f"TIMESTAMP '{value.isoformat(sep=' ')}'"
+    if isinstance(value, (list, tuple)):
+        return 'ARRAY[' + ', '.join(literal(v) for v in value) + ']'
+    return "'" + str(value).replace("'", "''") + "'"
+
+def utc_now() -> datetime:
+    """Current time as a naive UTC datetime, matching how Prisma stores DateTime"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a TIMESTAMP(3) column as emitted by COPY"""
+    return datetime.fromisoformat(value)
+
+def load_watermark(job: str) -> Tuple[Optional[datetime], str]:
+    """Return the (createdAt, id) a job last processed, or (None, '') on first run"""
+    rows = fetch_rows(
+        f'SELECT "lastCreatedAt", "lastId" FROM job_watermarks WHERE "job" = {literal(job)}'
+    )
+    if not rows:
+        return None, ''
+    return parse_timestamp(rows[0][0]), rows[0][1]
+
+def watermark_statement(job: str, created_at: datetime, row_id: str) -> str:
+    """SQL that advances a job's watermark; run it in the same script as the job's writes"""
+    return (
+        'INSERT INTO job_watermarks ("job", "lastCreatedAt", "lastId", "updatedAt")\n'
+        f'VALUES ({literal(job)}, {literal(created_at)}, {literal(row_id)}, CURRENT_TIMESTAMP)\n'
+        'ON CONFLICT ("job") DO UPDATE SET\n'
+        '  "lastCreatedAt" = EXCLUDED."lastCreatedAt",\n'
+        '  "lastId" = EXCLUDED."lastId",\n'
+        '  "updatedAt" = EXCLUDED."updatedAt";\n'
+    )
+
+# Orders that count as sales, the same filter as the admin analytics dashboard
+EXCLUDED_ORDER_STATUSES = ['CANCELLED', 'REFUNDED']
+INCLUDED_PAYMENT_STATUSES = ['PAID', 'PARTIALLY_REFUNDED']
+
+def sales_order_filter(table: str = '') -> str:
+    """WHERE condition keeping only completed, paid orders"""
+    prefix = f'{table}.' if table else ''
+    excluded = ', '.join(literal(s) for s in EXCLUDED_ORDER_STATUSES)
+    included = ', '.join(literal(s) for s in INCLUDED_PAYMENT_STATUSES)
+    return f'{prefix}"status" NOT IN ({excluded}) AND {prefix}"paymentStatus" IN ({included})'
+
+def keyset_after(since: Optional[datetime], since_id: str, table: str = '') -> str:
+    """WHERE condition selecting rows strictly after a (createdAt, id) watermark"""
+    if since is None:
+        return 'TRUE'
+    prefix = f'{table}.' if table else ''
+    return f'({prefix}"createdAt", {prefix}"id") > ({literal(since)}, {literal(since_id)})'
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Reconcile scraped catalog records against the products table
+
+Each scraped record is matched to at most one product row, trying in order:
+  1. source id   - scraped product id -> SKU via product-id-map.json, kept
+                   only when the product's slug or name still agrees
+  2. slug        - exact slug
+  3. name        - normalized name (entities decoded, case/punctuation and
+                   filler words like "salsa" dropped)
+  4. fuzzy       - name similarity, compared only against products that share
+                   a selective name token, or a selective pair of common
+                   tokens (blocking). Every block holds at most --max-block
+                   products, so the cost stays close to linear in catalog
+                   size instead of all pairs
+
+Exact passes run for every record before any fuzzy matching, so a fuzzy
+guess never takes a row another record matches exactly. Fuzzy matches that
+are weak or ambiguous are left for review instead of being guessed, and so
+are names that only extend another ("Cherry Chocolate Hot" vs "Cherry
+Hot"): those are as often a new flavor as a renamed listing.
+
+The result is a minimal plan (reconcile-plan.json):
+  inserts        scraped records with no product, with a stable new SKU
+  updates        matched products whose scraped fields differ
+  deactivations  active products no scraped record matched and no review
+                 item lists as a candidate
+  review         records with only ambiguous fuzzy candidates, names that
+                 extend a product's name, or new records whose slug another
+                 product already uses
+
+Pass --apply to execute the plan in one transaction. Only then is the SKU map
+updated, with every match and insert, so SKUs stay stable across scrapes; a
+run without --apply just writes the plan.
+
+Usage:
+    python3 scripts/reconcile-products.py
+    python3 scripts/reconcile-products.py --apply
+"""
+
+import argparse
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Any, Dict, List, Set, Tuple
+
+from catalog import SkuRegistry, clean_name, is_bundle, normalize_name
+from pgutil import REPO_ROOT, execute, fetch_rows, literal, utc_now
+
+SCRAPED_PATH = os.path.join(REPO_ROOT, 'scraped-products.json')
+PLAN_PATH = os.path.join(REPO_ROOT, 'reconcile-plan.json')
+
+# Matches prisma/seed.ts category assignment
+CATEGORY_SLUGS = {
+    'MILD': 'mild-salsa',
+    'MEDIUM': 'medium-salsa',
+    'HOT': 'hot-salsa',
+    'EXTRA_HOT': 'hot-salsa',
+    'FRUIT': 'gourmet-fruit-salsa',
+}
+
+# Fields the storefront curates by hand are only overwritten when asked for
+DEFAULT_UPDATE_FIELDS = ['price', 'description']
+UPDATABLE_FIELDS = ['name', 'slug', 'price', 'description', 'heatLevel']
+
+class ProductIndex:
+    """Hash indexes over product rows plus token and token-pair indexes for fuzzy blocking
+
+    Tokens shared by more than `max_block` products ("mild", "hot") are too
+    common to block on alone; products are then also indexed by pairs of
+    those common tokens ("hot mild").
+    """
+
+    def __init__(self, products: List[Dict[str, Any]], max_block: int):
+        self.products = products
+        self.by_sku: Dict[str, int] = {}
+        self.by_slug: Dict[str, int] = {}
+        self.by_name: Dict[str, List[int]] = defaultdict(list)
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.max_block = max_block
+
+        for i, product in enumerate(products):
+            self.by_sku[product['sku']] = i
+            self.by_slug[product['slug']] = i
+            key = normalize_name(product['name'])
+            product['key'] = key
+            self.by_name[key].append(i)
+            for token in set(key.split()):
+                self.postings[token].append(i)
+
+        self.common = {t for t, posting in self.postings.items() if len(posting) > max_block}
+        self.pair_postings: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for i, product in enumerate(products):
+            for pair in combinations(sorted(set(product['key'].split()) & self.common), 2):
+                self.pair_postings[pair].append(i)
+
+    def block(self, key: str) -> Set[int]:
+        """Products sharing a selective token or a selective pair of common tokens with the key
+
+        Blocks larger than `max_block` are skipped, so a record is compared with
+        at most max_block * (tokens + common token pairs) products.
+        """
+        tokens = set(key.split())
+        candidates: Set[int] = set()
+        for token in tokens - self.common:
+            candidates.update(self.postings.get(token, ()))
+        for pair in combinations(sorted(tokens & self.common), 2):
+            posting = self.pair_postings.get(pair, ())
+            if len(posting) <= self.max_block:
+                candidates.update(posting)
+        return candidates
+
+def similarity(a: str, b: str) -> float:
+    """Character similarity of two normalized names"""
+    return SequenceMatcher(None, a, b).ratio()
+
+def extends(a: str, b: str) -> bool:
+    """One name is the other plus extra words ("cherry chocolate hot" / "cherry hot")"""
+    ta, tb = set(a.split()), set(b.split())
+    shorter, longer = (ta, tb) if len(ta) <= len(tb) else (tb, ta)
+    return len(shorter) >= 2 and shorter < longer
+
+def load_products() -> List[Dict[str, Any]]:
+    return [
+        {'id': pid, 'name': name, 'slug': slug, 'sku': sku, 'heatLevel': heat,
+         'price': Decimal(price), 'description': description or '', 'isActive': active == 't'}
+        for pid, name, slug, sku, heat, price, description, active in fetch_rows(
+            'SELECT "id", "name", "slug", "sku", "heatLevel", "price", "description", "isActive" '
+            'FROM products'
+        )
+    ]
+
+def candidate(product: Dict[str, Any], score: float) -> Dict[str, Any]:
+    return {'productId': product['id'], 'name': product['name'], 'sku': product['sku'], 'score': round(score, 3)}
+
+def match_records(
+    records: List[Dict[str, Any]],
+    index: ProductIndex,
+    registry: SkuRegistry,
+    threshold: float,
+    margin: float,
+) -> Tuple[Dict[int, Tuple[int, str, float]], List[Dict[str, Any]]]:
+    """Map record position -> (product position, method, score); also return review items"""
+    matches: Dict[int, Tuple[int, str, float]] = {}
+    claimed: Set[int] = set()
+
+    def claim(r: int, p: int, method: str, score: float = 1.0) -> None:
+        matches[r] = (p, method, score)
+        claimed.add(p)
+
+    for r, record in enumerate(records):
+        sku = registry.get(record['id'])
+        p = index.by_sku.get(sku) if sku else None
+        if p is None or p in claimed:
+            continue
+        product = index.products[p]
+        # A stale or mis-assigned map entry must not pull in an unrelated row
+        if (product['slug'] == record['slug'] or product['key'] == record['key']
+                or (similarity(product['key'], record['key']) >= threshold
+                    and not extends(product['key'], record['key']))):
+            claim(r, p, 'source_id')
+
+    for r, record in enumerate(records):
+        if r in matches:
+            continue
+        p = index.by_slug.get(record['slug'])
+        if p is not None and p not in claimed:
+            claim(r, p, 'slug')
+
+    for r, record in enumerate(records):
+        if r in matches:
+            continue
+        free = [p for p in index.by_name.get(record['key'], []) if p not in claimed]
+        if free:
+            # Prefer the row whose heat level agrees with the scrape
+            free.sort(key=lambda p: index.products[p]['heatLevel'] != record['heatLevel'])
+            claim(r, free[0], 'name')
+
+    review = []
+    for r, record in enumerate(records):
+        if r in matches:
+            continue
+        scored = sorted(
+            ((similarity(record['key'], index.products[p]['key']), p)
+             for p in index.block(record['key']) if p not in claimed),
+            reverse=True,
+        )
+        if not scored:
+            continue
+        best_score, best = scored[0]
+        clear = len(scored) == 1 or best_score - scored[1][0] >= margin
+        if best_score >= threshold and clear and not extends(record['key'], index.products[best]['key']):
+            claim(r, best, 'fuzzy', best_score)
+            continue
+
+        # Never guessed: a name extending a product's name may be a new flavor
+        subsets = [(score, p) for score, p in scored if extends(record['key'], index.products[p]['key'])]
+        if subsets:
+            reason, shown = 'subset', subsets
+        elif best_score >= threshold:
+            reason, shown = 'ambiguous', scored
+        else:
+            continue
+        review.append({
+            'sourceId': record['id'],
+            'name': record['name'],
+            'reason': reason,
+            'candidates': [candidate(index.products[p], score) for score, p in shown[:3]],
+        })
+
+    return matches, review
+
+def build_plan(
+    records: List[Dict[str, Any]],
+    products: List[Dict[str, Any]],
+    registry: SkuRegistry,
+    update_fields: List[str],
+    threshold: float,
+    margin: float,
+    max_block: int,
+) -> Dict[str, Any]:
+    index = ProductIndex(products, max_block)
+    for product in products:
+        registry.reserve(product['sku'])
+
+    matches, review = match_records(records, index, registry, threshold, margin)
+    reviewed = {item['sourceId'] for item in review}
+    slugs_in_use = set(index.by_slug)
+
+    plan: Dict[str, Any] = {'matches': [], 'inserts': [], 'updates': [], 'deactivations': [], 'review': review}
+
+    for r, record in enumerate(records):
+        if r not in matches:
+            if record['id'] in reviewed:
+                continue
+            if record['slug'] in slugs_in_use:
+                # Another product (or an earlier insert) has the slug; inserting would fail
+                p = index.by_slug.get(record['slug'])
+                review.append({
+                    'sourceId': record['id'],
+                    'name': record['name'],
+                    'reason': 'slug-taken',
+                    'candidates': [] if p is None else [
+                        candidate(products[p], similarity(record['key'], products[p]['key']))
+                    ],
+                })
+                continue
+            slugs_in_use.add(record['slug'])
+            sku = registry.get(record['id'])
+            if sku is None or sku in index.by_sku:
+                sku = registry.new_sku(record['heatLevel'])
+            plan['inserts'].append({
+                'sourceId': record['id'],
+                'name': record['name'],
+                'slug': record['slug'],
+                'sku': sku,
+                'heatLevel': record['heatLevel'],
+                'price': str(record['price']),
+                'description': record['description'],
+                'image': record.get('image_url'),
+            })
+            continue
+
+        p, method, score = matches[r]
+        product = products[p]
+        plan['matches'].append({
+            'sourceId': record['id'], 'name': record['name'], 'productId': product['id'],
+            'sku': product['sku'], 'method': method, 'score': round(score, 3),
+        })
+
+        changes: Dict[str, List[Any]] = {}
+        for field in update_fields:
+            new = record[field]
+            old = product[field]
+            if field == 'description' and (not new or old):
+                continue  # only fill in missing descriptions
+            if field == 'slug' and new != old:
+                if new in slugs_in_use:
+                    continue  # taken by another product
+                slugs_in_use.add(new)
+            if new != old:
+                changes[field] = [str(old), str(new)]
+        if not product['isActive']:
+            changes['isActive'] = ['false', 'true']
+        if changes:
+            plan['updates'].append({'productId': product['id'], 'sku': product['sku'], 'changes': changes})
+
+    matched = {p for p, _, _ in matches.values()}
+    # Rows a reviewer may still pick stay active until the review is resolved
+    candidates = {c['productId'] for item in review for c in item['candidates']}
+    for p, product in enumerate(products):
+        if p not in matched and product['id'] not in candidates and product['isActive']:
+            plan['deactivations'].append({'productId': product['id'], 'sku': product['sku'], 'name': product['name']})
+
+    plan['summary'] = {
+        'scraped': len(records),
+        'matched': len(plan['matches']),
+        'byMethod': {
+            method: sum(1 for m in plan['matches'] if m['method'] == method)
+            for method in ['source_id', 'slug', 'name', 'fuzzy']
+        },
+        'inserts': len(plan['inserts']),
+        'updates': len(plan['updates']),
+        'deactivations': len(plan['deactivations']),
+        'review': len(review),
+    }
+    return plan
+
+def plan_script(plan: Dict[str, Any]) -> str:
+    columns = {'name': 'name', 'slug': 'slug', 'price': 'price', 'description': 'description',
+               'heatLevel': 'heatLevel', 'isActive': 'isActive'}
+    script = ''
+
+    for update in plan['updates']:
+        assignments = []
+        for field, (_, new) in update['changes'].items():
+            if field == 'isActive':
+                value = literal(new == 'true')
+            elif field == 'heatLevel':
+                value = f'{literal(new)}::"HeatLevel"'
+            else:
+                value = literal(new)
+            assignments.append(f'"{columns[field]}" = {value}')
+        assignments.append('"updatedAt" = CURRENT_TIMESTAMP')
+        script += f'UPDATE products SET {", ".join(assignments)} WHERE "id" = {literal(update["productId"])};\n'
+
+    categories = sorted({CATEGORY_SLUGS.get(item['heatLevel'], 'gourmet-fruit-salsa') for item in plan['inserts']})
+    if categories:
+        # INSERT ... SELECT from a missing category would insert nothing; abort the transaction instead
+        script += (
+            'DO $$\nDECLARE missing TEXT;\nBEGIN\n'
+            f'  SELECT string_agg(s, \', \') INTO missing FROM unnest({literal(categories)}) AS s\n'
+            '    WHERE NOT EXISTS (SELECT 1 FROM categories WHERE "slug" = s);\n'
+            "  IF missing IS NOT NULL THEN RAISE EXCEPTION 'Missing product categories: %', missing; END IF;\n"
+            'END $$;\n'
+        )
+
+    for item in plan['inserts']:
+        category = literal(CATEGORY_SLUGS.get(item['heatLevel'], 'gourmet-fruit-salsa'))
+        images = literal([item['image']]) if item['image'] else "'{}'"
+        script += (
+            'INSERT INTO products ("id", "name", "slug", "description", "heatLevel", "ingredients", "price", '
+            '"sku", "images", "featuredImage", "searchKeywords", "categoryId", "updatedAt")\n'
+            f'SELECT gen_random_uuid()::text, {literal(item["name"])}, {literal(item["slug"])}, '
+            f'{literal(item["description"] or None)}, {literal(item["heatLevel"])}::"HeatLevel", \'{{}}\', '
+            f'{item["price"]}, {literal(item["sku"])}, {images}, {literal(item["image"])}, '
+            f'{literal(item["name"].lower().split())}, "id", CURRENT_TIMESTAMP '
+            f'FROM categories WHERE "slug" = {category};\n'
+        )
+
+    if plan['deactivations']:
+        ids = literal([d['productId'] for d in plan['deactivations']])
+        script += f'UPDATE products SET "isActive" = FALSE, "updatedAt" = CURRENT_TIMESTAMP WHERE "id" = ANY({ids});\n'
+
+    return script
+
+def record_skus(plan: Dict[str, Any], registry: SkuRegistry) -> None:
+    """Remember the SKU of every matched and inserted scraped id of an applied plan"""
+    for match in plan['matches']:
+        registry.assign(match['sourceId'], match['sku'])
+    for item in plan['inserts']:
+        registry.assign(item['sourceId'], item['sku'])
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r') as f:
+        scraped = json.load(f)
+    records = []
+    for p in scraped:
+        if is_bundle(p):
+            continue
+        name = clean_name(p['name'])
+        records.append({
+            'id': str(p['id']),
+            'name': name,
+            'slug': p['slug'],
+            'key': normalize_name(name),
+            'heatLevel': p.get('heat_level', 'FRUIT'),
+            'price': Decimal(str(p['price'])).quantize(Decimal('0.01')),
+            'description': p.get('description') or '',
+            'image_url': p.get('image_url'),
+        })
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scraped', default=SCRAPED_PATH, help='scraped products JSON')
+    parser.add_argument('--plan', default=PLAN_PATH, help='where to write the plan')
+    parser.add_argument('--update-fields', default=','.join(DEFAULT_UPDATE_FIELDS),
+                        help=f"comma separated subset of {','.join(UPDATABLE_FIELDS)}")
+    parser.add_argument('--threshold', type=float, default=0.85, help='minimum fuzzy similarity')
+    parser.add_argument('--margin', type=float, default=0.05,
+                        help='fuzzy best must beat the runner-up by this much')
+    parser.add_argument('--max-block', type=int, default=50,
+                        help='name tokens or token pairs shared by more products than this are not used for blocking')
+    parser.add_argument('--max-deactivate', type=float, default=0.25,
+                        help='refuse to apply if more than this share of active products would be deactivated')
+    parser.add_argument('--apply', action='store_true', help='execute the plan')
+    args = parser.parse_args()
+
+    update_fields = [f for f in args.update_fields.split(',') if f]
+    unknown = set(update_fields) - set(UPDATABLE_FIELDS)
+    if unknown:
+        parser.error(f"Unknown update fields: {', '.join(sorted(unknown))}")
+
+    print("=" * 70)
+    print("PRODUCT RECONCILIATION")
+    print("=" * 70)
+
+    records = load_records(args.scraped)
+    products = load_products()
+    registry = SkuRegistry()
+    print(f"\nScraped records: {len(records)}   Database products: {len(products)}")
+
+    plan = build_plan(records, products, registry, update_fields, args.threshold, args.margin, args.max_block)
+    plan['generatedAt'] = utc_now().isoformat(timespec='seconds') + 'Z'
+
+    with open(args.plan, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+    summary = plan['summary']
+    print(f"\nMatched: {summary['matched']}  " + '  '.join(f"{k}={v}" for k, v in summary['byMethod'].items()))
+    print(f"Inserts: {summary['inserts']}   Updates: {summary['updates']}   "
+          f"Deactivations: {summary['deactivations']}   Needs review: {summary['review']}")
+    print(f"\n✓ Plan written to: {args.plan}")
+
+    if args.apply:
+        active = sum(1 for p in products if p['isActive'])
+        if active and summary['deactivations'] / active > args.max_deactivate:
+            raise SystemExit(
+                f"Refusing to deactivate {summary['deactivations']} of {active} active products; "
+                "check the scrape or raise --max-deactivate"
+            )
+        execute(plan_script(plan))
+        print("\n✅ Plan applied")
+
+        record_skus(plan, registry)
+        registry.save()
+        print(f"✓ SKU map saved to: {registry.path}")
+
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import subprocess
 from typing import List, Dict, Any
 from urllib.parse import urljoin
 
+from catalog import clean_name
+
 # Note: This script uses curl to avoid installing Python dependencies
 # It parses the HTML using regex which is sufficient for this structured data
 
@@ -59,7 +61,7 @@ def extract_products_from_page(html: str) -> List[Dict[str, Any]]:
             
             products.append({
                 'id': product_id,
-                'name': name,
+                'name': clean_name(name),  # data-name is HTML-escaped
                 'slug': slug,
                 'url': url,
                 'price': 7.00,  # All individual jars are $7.00
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Monthly fundraiser and wholesale settlement reports
+
+Streams paid order lines for fundraiser and wholesale orders out of the
+database and settles them per calendar month (UTC):
+  - per fundraiser: orders, units, sales, commissionable sales and the
+    commission owed (commissionRate is a percentage)
+  - per wholesale account: orders, units, sales and invoice totals
+
+A month is closed once it ended more than --grace-days ago. Closed months are
+cached as JSON under the output directory and never recomputed unless
+--refresh is passed, so a run only re-reads the open months. All money is
+handled as Decimal and rounded half-up to cents once per settlement line.
+
+Campaign totals always run from each fundraiser's start month to the current
+month, whatever --from/--to select; months outside the range are loaded from
+the cache or settled as well, but only the selected months go into the
+monthly CSVs.
+
+Outputs (default reports/settlements/):
+    <YYYY-MM>.json            per-month report, also the cache for closed months
+    fundraisers.csv           one row per fundraiser per month
+    fundraiser-campaigns.csv  campaign-to-date totals and goal progress (since startDate)
+    wholesale.csv             one row per wholesale account per month
+
+Usage:
+    python3 scripts/settlement-report.py
+    python3 scripts/settlement-report.py --from 2024-01 --to 2024-12
+"""
+
+import argparse
+import csv
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pgutil import REPO_ROOT, fetch_rows, literal, sales_order_filter, stream_rows, utc_now
+
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, 'reports', 'settlements')
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+OUTSTANDING_INVOICE_STATUSES = {'SENT', 'OVERDUE'}
+
+def money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def parse_period(value: str) -> Tuple[int, int]:
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got {value!r}")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM, got {value!r}")
+    return year, month
+
+def period_key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+def period_arg(value: str) -> str:
+    return period_key(*parse_period(value))
+
+def period_start(period: str) -> datetime:
+    year, month = parse_period(period)
+    return datetime(year, month, 1)
+
+def next_period(period: str) -> str:
+    year, month = parse_period(period)
+    return period_key(year + month // 12, month % 12 + 1)
+
+def period_range(first: str, last: str) -> List[str]:
+    periods = []
+    period = first
+    while period <= last:
+        periods.append(period)
+        period = next_period(period)
+    return periods
+
+def is_closed(period: str, now: datetime, grace: timedelta) -> bool:
+    return period_start(next_period(period)) + grace <= now
+
+def in_periods(column: str, periods: List[str]) -> str:
+    """WHERE condition on a timestamp column matching only the given months
+
+    Consecutive months are merged into one [start, end) range, so a backfill of
+    two distant months scans those two months rather than everything between.
+    """
+    ranges: List[List[str]] = []
+    for period in sorted(set(periods)):
+        if ranges and next_period(ranges[-1][1]) == period:
+            ranges[-1][1] = period
+        else:
+            ranges.append([period, period])
+    conditions = [
+        f'({column} >= {literal(period_start(first))} AND {column} < {literal(period_start(next_period(last)))})'
+        for first, last in ranges
+    ]
+    return '(' + ' OR '.join(conditions) + ')'
+
+def load_fundraisers() -> Dict[str, Dict[str, Any]]:
+    fundraisers = {}
+    for fid, name, organization, rate, goal, start, end in fetch_rows(
+        'SELECT "id", "name", "organizationName", "commissionRate", "goal", "startDate", "endDate" '
+        'FROM fundraisers'
+    ):
+        fundraisers[fid] = {
+            'name': name,
+            'organization': organization,
+            'commissionRate': Decimal(rate),
+            'goal': Decimal(goal) if goal is not None else None,
+            'startDate': start[:10],
+            'endDate': end[:10],
+        }
+    return fundraisers
+
+def load_fundraiser_products() -> Dict[str, Set[str]]:
+    """Active product links per fundraiser; a fundraiser without links earns on every item"""
+    links: Dict[str, Set[str]] = defaultdict(set)
+    for fid, product_id in fetch_rows(
+        'SELECT "fundraiserId", "productId" FROM fundraiser_products WHERE "isActive"'
+    ):
+        links[fid].add(product_id)
+    return links
+
+def load_wholesale_accounts() -> Dict[str, Dict[str, Any]]:
+    """Wholesale accounts keyed by userId"""
+    accounts = {}
+    for account_id, user_id, business_name, discount_rate in fetch_rows(
+        'SELECT "id", "userId", "businessName", "discountRate" FROM wholesale_accounts'
+    ):
+        accounts[user_id] = {
+            'accountId': account_id,
+            'businessName': business_name,
+            'discountRate': Decimal(discount_rate),
+        }
+    return accounts
+
+def first_order_period() -> Optional[str]:
+    rows = fetch_rows(
+        'SELECT MIN("createdAt") FROM orders '
+        'WHERE "fundraiserId" IS NOT NULL OR "userId" IN (SELECT "userId" FROM wholesale_accounts)'
+    )
+    return rows[0][0][:7] if rows and rows[0][0] else None
+
+def empty_fundraiser() -> Dict[str, Any]:
+    return {'orders': set(), 'units': 0, 'sales': ZERO, 'commissionable': ZERO,
+            'products': defaultdict(lambda: {'name': '', 'units': 0, 'sales': ZERO})}
+
+def empty_wholesale() -> Dict[str, Any]:
+    return {'orders': set(), 'units': 0, 'sales': ZERO,
+            'invoiced': ZERO, 'invoicesPaid': ZERO, 'invoicesOutstanding': ZERO}
+
+def compute_periods(
+    periods: List[str],
+    fundraisers: Dict[str, Dict[str, Any]],
+    links: Dict[str, Set[str]],
+    accounts: Dict[str, Dict[str, Any]],
+    batch_size: int,
+) -> Dict[str, Dict[str, Any]]:
+    """Stream order lines and invoices for the given months and settle them"""
+    order_months = in_periods('o."createdAt"', periods)
+    invoice_months = in_periods('i."createdAt"', periods)
+
+    by_fundraiser: Dict[Tuple[str, str], Dict[str, Any]] = defaultdict(empty_fundraiser)
+    by_account: Dict[Tuple[str, str], Dict[str, Any]] = defaultdict(empty_wholesale)
+
+    query = (
+        'SELECT o."id", o."createdAt", o."fundraiserId", o."userId", '
+        'oi."productId", oi."productName", oi."quantity", oi."totalPrice" '
+        'FROM orders o JOIN order_items oi ON oi."orderId" = o."id" '
+        f'WHERE {order_months} '
+        f'AND {sales_order_filter("o")} '
+        'AND (o."fundraiserId" IS NOT NULL OR o."userId" IN (SELECT "userId" FROM wholesale_accounts))'
+    )
+
+    lines = 0
+    for batch in stream_rows(query, batch_size):
+        for order_id, created_at, fid, user_id, product_id, product_name, quantity, total in batch:
+            period = created_at[:7]
+            units = int(quantity)
+            sales = Decimal(total)
+
+            if fid is not None:
+                entry = by_fundraiser[(period, fid)]
+                entry['orders'].add(order_id)
+                entry['units'] += units
+                entry['sales'] += sales
+                if not links.get(fid) or product_id in links[fid]:
+                    entry['commissionable'] += sales
+                product = entry['products'][product_id]
+                product['name'] = product_name
+                product['units'] += units
+                product['sales'] += sales
+
+            if user_id in accounts:
+                entry = by_account[(period, user_id)]
+                entry['orders'].add(order_id)
+                entry['units'] += units
+                entry['sales'] += sales
+        lines += len(batch)
+        print(f"  Settled {lines} order lines...")
+
+    # Invoices belong to an account through their order, or directly via customerId
+    for created_at, status, total, user_id in fetch_rows(
+        'SELECT i."createdAt", i."status", i."total", COALESCE(o."userId", i."customerId") '
+        'FROM invoices i LEFT JOIN orders o ON o."id" = i."orderId" '
+        f'WHERE {invoice_months} '
+        'AND i."status" NOT IN (\'DRAFT\', \'CANCELLED\')'
+    ):
+        period = created_at[:7]
+        if user_id not in accounts:
+            continue
+        entry = by_account[(period, user_id)]
+        amount = Decimal(total)
+        entry['invoiced'] += amount
+        if status == 'PAID':
+            entry['invoicesPaid'] += amount
+        elif status in OUTSTANDING_INVOICE_STATUSES:
+            entry['invoicesOutstanding'] += amount
+
+    reports = {period: {'period': period, 'fundraisers': [], 'wholesale': []} for period in periods}
+
+    for (period, fid), entry in sorted(by_fundraiser.items()):
+        info = fundraisers.get(fid, {'name': fid, 'organization': '', 'commissionRate': ZERO})
+        reports[period]['fundraisers'].append({
+            'fundraiserId': fid,
+            'name': info['name'],
+            'organization': info['organization'],
+            'orders': len(entry['orders']),
+            'units': entry['units'],
+            'sales': money(entry['sales']),
+            'commissionableSales': money(entry['commissionable']),
+            'commissionRate': info['commissionRate'],
+            'commission': money(entry['commissionable'] * info['commissionRate'] / 100),
+            'products': [
+                {'productId': pid, 'name': p['name'], 'units': p['units'], 'sales': money(p['sales'])}
+                for pid, p in sorted(entry['products'].items(), key=lambda item: -item[1]['sales'])
+            ],
+        })
+
+    for (period, user_id), entry in sorted(by_account.items()):
+        account = accounts[user_id]
+        reports[period]['wholesale'].append({
+            'accountId': account['accountId'],
+            'businessName': account['businessName'],
+            'discountRate': account['discountRate'],
+            'orders': len(entry['orders']),
+            'units': entry['units'],
+            'sales': money(entry['sales']),
+            'invoiced': money(entry['invoiced']),
+            'invoicesPaid': money(entry['invoicesPaid']),
+            'invoicesOutstanding': money(entry['invoicesOutstanding']),
+        })
+
+    for report in reports.values():
+        report['totals'] = {
+            'fundraiserSales': sum((f['sales'] for f in report['fundraisers']), ZERO),
+            'commissionOwed': sum((f['commission'] for f in report['fundraisers']), ZERO),
+            'wholesaleSales': sum((w['sales'] for w in report['wholesale']), ZERO),
+            'wholesaleInvoiced': sum((w['invoiced'] for w in report['wholesale']), ZERO),
+        }
+
+    return reports
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_json(v) for v in value]
+    return value
+
+def from_json(value: Any, key: str = '') -> Any:
+    money_keys = {
+        'sales', 'commissionableSales', 'commissionRate', 'commission', 'discountRate',
+        'invoiced', 'invoicesPaid', 'invoicesOutstanding',
+        'fundraiserSales', 'commissionOwed', 'wholesaleSales', 'wholesaleInvoiced',
+    }
+    if isinstance(value, dict):
+        return {k: from_json(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [from_json(v) for v in value]
+    if key in money_keys and isinstance(value, str):
+        return Decimal(value)
+    return value
+
+def write_csv(path: str, header: List[str], rows: List[List[Any]]) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def campaign_periods(fundraisers: Dict[str, Dict[str, Any]], current: str) -> Set[str]:
+    """Months from each fundraiser's start up to the current month"""
+    periods: Set[str] = set()
+    for info in fundraisers.values():
+        periods.update(period_range(info['startDate'][:7], current))
+    return periods
+
+def settle(
+    periods: List[str],
+    fundraisers: Dict[str, Dict[str, Any]],
+    output_dir: str,
+    refresh: bool,
+    now: datetime,
+    grace: timedelta,
+    batch_size: int,
+) -> Dict[str, Dict[str, Any]]:
+    """Reports for the given months: closed months from the cache, the rest settled and cached"""
+    reports: Dict[str, Dict[str, Any]] = {}
+    if not periods:
+        return reports
+    to_compute = []
+    for period in periods:
+        cache_path = os.path.join(output_dir, f"{period}.json")
+        if not refresh and is_closed(period, now, grace) and os.path.exists(cache_path):
+            with open(cache_path, 'r') as f:
+                cached = from_json(json.load(f))
+            if cached.get('closed'):
+                reports[period] = cached
+                continue
+        to_compute.append(period)
+
+    print(f"\nMonths {periods[0]} → {periods[-1]}: {len(reports)} cached, {len(to_compute)} to compute")
+
+    if to_compute:
+        computed = compute_periods(
+            to_compute, fundraisers, load_fundraiser_products(), load_wholesale_accounts(), batch_size
+        )
+        for period, report in computed.items():
+            report['closed'] = is_closed(period, now, grace)
+            report['generatedAt'] = now.isoformat(timespec='seconds') + 'Z'
+            with open(os.path.join(output_dir, f"{period}.json"), 'w') as f:
+                json.dump(to_json(report), f, indent=2)
+            reports[period] = report
+
+    return reports
+
+def export(
+    reports: List[Dict[str, Any]],
+    campaign_reports: List[Dict[str, Any]],
+    fundraisers: Dict[str, Dict[str, Any]],
+    output_dir: str,
+) -> None:
+    """Monthly CSVs cover `reports`; campaign totals sum `campaign_reports` from each start month"""
+    write_csv(
+        os.path.join(output_dir, 'fundraisers.csv'),
+        ['period', 'closed', 'fundraiserId', 'name', 'organization', 'orders', 'units',
+         'sales', 'commissionableSales', 'commissionRate', 'commission'],
+        [
+            [r['period'], r['closed'], f['fundraiserId'], f['name'], f['organization'], f['orders'],
+             f['units'], f['sales'], f['commissionableSales'], f['commissionRate'], f['commission']]
+            for r in reports for f in r['fundraisers']
+        ],
+    )
+
+    write_csv(
+        os.path.join(output_dir, 'wholesale.csv'),
+        ['period', 'closed', 'accountId', 'businessName', 'orders', 'units', 'sales',
+         'invoiced', 'invoicesPaid', 'invoicesOutstanding'],
+        [
+            [r['period'], r['closed'], w['accountId'], w['businessName'], w['orders'], w['units'],
+             w['sales'], w['invoiced'], w['invoicesPaid'], w['invoicesOutstanding']]
+            for r in reports for w in r['wholesale']
+        ],
+    )
+
+    campaigns: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {'orders': 0, 'units': 0, 'sales': ZERO, 'commission': ZERO}
+    )
+    for r in campaign_reports:
+        for f in r['fundraisers']:
+            info = fundraisers.get(f['fundraiserId'])
+            if info is not None and r['period'] < info['startDate'][:7]:
+                continue
+            c = campaigns[f['fundraiserId']]
+            c['orders'] += f['orders']
+            c['units'] += f['units']
+            c['sales'] += f['sales']
+            c['commission'] += f['commission']
+
+    rows = []
+    for fid, c in sorted(campaigns.items(), key=lambda item: -item[1]['sales']):
+        info = fundraisers.get(fid, {})
+        goal = info.get('goal')
+        progress = f"{(c['sales'] / goal * 100).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)}" if goal else ''
+        rows.append([fid, info.get('name', ''), info.get('startDate', ''), info.get('endDate', ''),
+                     c['orders'], c['units'], c['sales'], c['commission'], goal or '', progress])
+    write_csv(
+        os.path.join(output_dir, 'fundraiser-campaigns.csv'),
+        ['fundraiserId', 'name', 'startDate', 'endDate', 'orders', 'units', 'sales',
+         'commission', 'goal', 'goalProgressPercent'],
+        rows,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--from', dest='first', type=period_arg, default=None,
+                        help='first month (YYYY-MM), defaults to the first settled order')
+    parser.add_argument('--to', dest='last', type=period_arg, default=None,
+                        help='last month (YYYY-MM), defaults to the current month')
+    parser.add_argument('--grace-days', type=int, default=7,
+                        help='days after month end before a month is closed and cached')
+    parser.add_argument('--refresh', action='store_true', help='recompute cached closed months')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--batch-size', type=int, default=20000,
+                        help='rows fetched per streamed batch')
+    args = parser.parse_args()
+
+    now = utc_now()
+    grace = timedelta(days=args.grace_days)
+
+    print("=" * 70)
+    print("SETTLEMENT REPORT")
+    print("=" * 70)
+
+    last = args.last or now.strftime('%Y-%m')
+    first = args.first or first_order_period()
+    if first is None:
+        print("No fundraiser or wholesale orders found")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    fundraisers = load_fundraisers()
+    selected = period_range(first, last)
+    periods = sorted(set(selected) | campaign_periods(fundraisers, now.strftime('%Y-%m')))
+    reports = settle(periods, fundraisers, args.output_dir, args.refresh, now, grace, args.batch_size)
+
+    ordered = [reports[period] for period in selected]
+    export(ordered, [reports[period] for period in periods], fundraisers, args.output_dir)
+
+    print(f"\n{'Month':<9} {'Fundraiser sales':>17} {'Commission':>12} {'Wholesale':>12}  Status")
+    for r in ordered:
+        t = r['totals']
+        status = 'closed' if r['closed'] else 'open'
+        print(f"{r['period']:<9} {t['fundraiserSales']:>17} {t['commissionOwed']:>12} {t['wholesaleSales']:>12}  {status}")
+
+    print(f"\n✅ Reports written to: {args.output_dir}")
+    print("=" * 70)
+
+if __name__ == "__main__":
+    main()
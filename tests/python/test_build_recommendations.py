@@ -0,0 +1,97 @@
+"""
+Tests for scripts/build-recommendations.py
+
+Run with: python3 -m pytest -q tests/python  (or python3 -m unittest discover tests/python)
+"""
+
+import importlib.util
+import math
+import os
+import re
+import sys
+import unittest
+from collections import Counter
+from datetime import datetime
+from unittest import mock
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+_spec = importlib.util.spec_from_file_location('build_recommendations', os.path.join(SCRIPTS_DIR, 'build-recommendations.py'))
+recommendations = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(recommendations)
+
+def order_rows(baskets, first=0):
+    """order_items rows, grouped by order as the query returns them"""
+    return [
+        [f'o{first + i}', f'2026-10-19 09:{first + i:02d}:00', product_id]
+        for i, basket in enumerate(baskets)
+        for product_id in basket
+    ]
+
+def count_pairs(baskets, first=0):
+    with mock.patch.object(recommendations, 'stream_rows', return_value=iter([order_rows(baskets, first)])):
+        return recommendations.count_order_pairs(None, '', datetime(2026, 10, 20), 1000)
+
+class CountOrderPairsTest(unittest.TestCase):
+    def test_counts_each_pair_once_per_order(self):
+        pairs, last, orders = count_pairs([['a', 'b', 'a'], ['b', 'c'], ['a']])
+        self.assertEqual(orders, 3)
+        self.assertEqual(last, (datetime(2026, 10, 19, 9, 2), 'o2'))
+        self.assertEqual(pairs, Counter({
+            ('a', 'a'): 2, ('b', 'b'): 2, ('c', 'c'): 1, ('a', 'b'): 1, ('b', 'c'): 1,
+        }))
+
+class TopNeighborsTest(unittest.TestCase):
+    def test_cosine_ranking_with_filters(self):
+        counts = Counter({
+            ('a', 'a'): 10, ('b', 'b'): 5, ('c', 'c'): 20, ('d', 'd'): 4, ('e', 'e'): 1,
+            ('a', 'b'): 4, ('a', 'c'): 6, ('a', 'd'): 2, ('a', 'e'): 1,
+        })
+        result = recommendations.top_neighbors(counts, ['a', 'b'], {'a', 'b', 'c', 'e'}, 2, 2)
+
+        # d is inactive and e is below min_support
+        self.assertEqual([n for n, _ in result['a']], ['b', 'c'])
+        self.assertAlmostEqual(result['a'][0][1], 4 / math.sqrt(10 * 5))
+        self.assertAlmostEqual(result['a'][1][1], 6 / math.sqrt(10 * 20))
+        self.assertEqual(result['b'], [('a', 4 / math.sqrt(5 * 10))])
+
+class IncrementalTest(unittest.TestCase):
+    def test_incremental_update_matches_full_rebuild(self):
+        history = [['a', 'b'], ['a', 'c'], ['b', 'c', 'd'], ['d', 'e'], ['e']]
+        new = [['a', 'b'], ['a', 'd']]
+        stored, _, _ = count_pairs(history)
+
+        def fetch_rows(query):
+            # Answer the two product_cooccurrence lookups from the stored counts
+            ids = set(re.findall(r"'([^']*)'", query))
+            if '"productA" = "productB"' in query:
+                return [[a, b, str(n)] for (a, b), n in stored.items() if a == b and a in ids]
+            return [[a, b, str(n)] for (a, b), n in stored.items() if a in ids or b in ids]
+
+        pairs, _, _ = count_pairs(new, first=len(history))
+        touched = {a for a, b in pairs if a == b}
+        with mock.patch.object(recommendations, 'fetch_rows', side_effect=fetch_rows):
+            counts = recommendations.load_cooccurrence(touched)
+        counts.update(pairs)
+
+        active = {'a', 'b', 'c', 'd', 'e'}
+        incremental = recommendations.top_neighbors(counts, touched, active, 8, 1)
+        full_counts, _, _ = count_pairs(history + new)
+        full = recommendations.top_neighbors(full_counts, touched, active, 8, 1)
+        self.assertEqual(touched, {'a', 'b', 'd'})
+        self.assertEqual(incremental, full)
+
+class RecipePairingsTest(unittest.TestCase):
+    def test_rare_tags_weigh_more_and_ties_are_stable(self):
+        product_tags = [['p1', 'spicy'], ['p2', 'spicy'], ['p3', 'spicy'], ['p2', 'mango']]
+        recipe_tags = [['r1', 'spicy'], ['r2', 'spicy'], ['r1', 'mango'], ['r3', 'grill']]
+        with mock.patch.object(recommendations, 'fetch_rows', side_effect=[product_tags, recipe_tags]):
+            product_recipes, recipe_products = recommendations.recipe_pairings(2)
+
+        # The shared rare mango tag puts p2 first; p1/p3 tie on spicy and are ordered by id
+        self.assertEqual(recipe_products, {'r1': ['p2', 'p3'], 'r2': ['p3', 'p2']})
+        self.assertEqual(product_recipes, {'p1': ['r2', 'r1'], 'p2': ['r1', 'r2'], 'p3': ['r2', 'r1']})
+
+if __name__ == '__main__':
+    unittest.main()
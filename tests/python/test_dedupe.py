@@ -0,0 +1,114 @@
+"""
+Tests for scripts/dedupe.py
+
+Run with: python3 -m pytest -q tests/python  (or python3 -m unittest discover tests/python)
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from dedupe import (  # noqa: E402
+    cluster_signatures,
+    dedupe_records,
+    find_boilerplate_descriptions,
+    find_duplicate_listings,
+    minhash,
+)
+
+def clusters_by_name(records, clusters):
+    return sorted(sorted(records[i]['name'] for i in members) for members in clusters)
+
+class DuplicateListingsTest(unittest.TestCase):
+    def test_relisted_and_spelled_out_names_cluster(self):
+        records = [
+            {'name': 'XX Hot', 'slug': 'xx-hot'},
+            {'name': 'X X Hot', 'slug': 'x-x-hot'},
+            {'name': 'Peach Mild', 'slug': 'peach-mild'},
+            {'name': 'Peach Mild', 'slug': 'peach-mild-1'},
+            {'name': 'Peach Hot', 'slug': 'peach-hot'},
+        ]
+        self.assertEqual(clusters_by_name(records, find_duplicate_listings(records)), [
+            ['Peach Mild', 'Peach Mild'],
+            ['X X Hot', 'XX Hot'],
+        ])
+
+    def test_clusters_do_not_depend_on_record_order(self):
+        # A different-heat listing first in a bucket must not hide the duplicates after it
+        records = [
+            {'name': 'Peach Mango Mild'},
+            {'name': 'Peach Mango Hot'},
+            {'name': 'Peach-Mango Hot'},
+            {'name': 'Peach Mango  Hot'},
+        ]
+        for order in itertools.permutations(records):
+            order = list(order)
+            self.assertEqual(clusters_by_name(order, find_duplicate_listings(order)),
+                             [['Peach Mango  Hot', 'Peach Mango Hot', 'Peach-Mango Hot']])
+
+    def test_incompatible_first_member_does_not_hide_a_bucket(self):
+        # Identical signatures put every record in the same bucket of every band
+        signature = minhash({'abc', 'bcd', 'cde'})
+        signatures = [signature] * 4
+        clusters = cluster_signatures(signatures, 0.8, lambda a, b: 0 not in (a, b))
+        self.assertEqual(clusters, [[1, 2, 3]])
+
+    def test_near_matches_do_not_chain(self):
+        # B is within 0.875 of A and of C, but A and C only share 0.75
+        a = tuple(range(64))
+        b = a[:56] + tuple(range(100, 108))
+        c = tuple(range(200, 208)) + b[8:]
+        for signatures in ([a, b, c], [c, b, a]):
+            clusters = cluster_signatures(signatures, 0.8)
+            self.assertEqual(len(clusters), 1)
+            self.assertEqual(len(clusters[0]), 2)
+            self.assertIn(signatures.index(b), clusters[0])
+
+    def test_canonical_prefers_original_slug(self):
+        records = [
+            {'id': '120', 'name': 'Peach Mild', 'slug': 'peach-mild-1', 'description': 'Sweet peaches.'},
+            {'id': '95', 'name': 'Peach Mild', 'slug': 'peach-mild', 'description': 'Sweet peaches.'},
+        ]
+        result = dedupe_records(records)
+        self.assertEqual(result['canonical'], [1])
+
+class BoilerplateDescriptionsTest(unittest.TestCase):
+    def test_template_text_with_product_names_clusters(self):
+        records = [
+            {'name': 'Original Mild', 'description': 'Delicious Original Mild salsa made with premium ingredients.'},
+            {'name': 'Cherry Hot', 'description': 'Delicious Cherry Hot salsa made with premium ingredients.'},
+            {'name': 'Garden Fresh Cilantro', 'description': 'Delicious Garden Fresh Cilantro salsa made with premium ingredients.'},
+            {'name': 'Mango Habanero', 'description': 'Ripe mangoes and habanero heat in a sweet, fiery blend.'},
+        ]
+        self.assertEqual(clusters_by_name(records, find_boilerplate_descriptions(records)),
+                         [['Cherry Hot', 'Garden Fresh Cilantro', 'Original Mild']])
+
+    def test_full_description_is_checked_when_present(self):
+        # organized-products.json: the scraped description is empty, the fallback text is not
+        records = [
+            {'name': name, 'description': '', 'full_description': f'Delicious {name} salsa made with premium ingredients.'}
+            for name in ['Cherry Hot', 'Green Apple', 'Jamaican Jerk']
+        ]
+        self.assertEqual(find_boilerplate_descriptions(records), [[0, 1, 2]])
+
+    def test_single_use_of_fallback_template_is_flagged(self):
+        records = [
+            {'name': 'Roasted Garlic & Olives', 'description': '',
+             'full_description': 'Delicious Roasted Garlic & Olives salsa made with premium ingredients.'},
+            {'name': 'Mango Habanero', 'description': 'Ripe mangoes and habanero heat in a sweet, fiery blend.'},
+        ]
+        self.assertEqual(find_boilerplate_descriptions(records), [[0]])
+
+    def test_same_product_repeated_is_not_boilerplate(self):
+        records = [
+            {'name': 'Original Mild', 'description': 'Our first salsa, still made by hand.'},
+            {'name': 'Original Mild Salsa', 'description': 'Our first salsa, still made by hand.'},
+        ]
+        self.assertEqual(find_boilerplate_descriptions(records), [])
+
+if __name__ == '__main__':
+    unittest.main()
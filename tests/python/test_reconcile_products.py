@@ -0,0 +1,261 @@
+"""
+Tests for scripts/reconcile-products.py and the catalog helpers it uses
+
+Run with: python3 -m pytest -q tests/python  (or python3 -m unittest discover tests/python)
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from catalog import SkuRegistry, normalize_name  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location('reconcile_products', os.path.join(SCRIPTS_DIR, 'reconcile-products.py'))
+reconcile = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(reconcile)
+
+def product(pid, name, slug, sku, heat='HOT', active=True, description=''):
+    return {'id': pid, 'name': name, 'slug': slug, 'sku': sku, 'heatLevel': heat,
+            'price': Decimal('7.00'), 'description': description, 'isActive': active}
+
+def record(source_id, name, slug, heat='HOT', price='7.00'):
+    return {'id': source_id, 'name': name, 'slug': slug, 'key': normalize_name(name), 'heatLevel': heat,
+            'price': Decimal(price), 'description': '', 'image_url': None}
+
+class ReconcileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.map_path = os.path.join(self.tmp.name, 'product-id-map.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def registry(self, skus=None):
+        if skus is not None:
+            with open(self.map_path, 'w') as f:
+                json.dump(skus, f)
+        return SkuRegistry(self.map_path)
+
+    def plan(self, records, products, registry=None, update_fields=('price',)):
+        return reconcile.build_plan(records, products, registry or self.registry(), list(update_fields),
+                                    threshold=0.85, margin=0.05, max_block=50)
+
+class NormalizeNameTest(unittest.TestCase):
+    def test_decodes_entities_and_drops_filler_words(self):
+        self.assertEqual(normalize_name('Roasted Garlic &amp; Olives'), 'roasted garlic olives')
+        self.assertEqual(normalize_name('Jose Madrid Original Mild Salsa'), 'original mild')
+
+    def test_folds_spelled_out_heat(self):
+        self.assertEqual(normalize_name('X X Hot'), normalize_name('XX Hot'))
+
+    def test_ignores_case_and_punctuation(self):
+        self.assertEqual(normalize_name('Clovis Medium (Original Medium Chunky)'),
+                         normalize_name('clovis medium - original medium, chunky'))
+
+class MatchPassesTest(ReconcileTestCase):
+    def test_exact_passes_run_in_order(self):
+        products = [
+            product('p1', 'Original Hot', 'original-hot', 'JMS-HOT-001'),
+            product('p2', 'Cherry Hot', 'cherry-hot', 'JMS-HOT-002'),
+            product('p3', 'Roasted Garlic & Olives', 'garlic-olives', 'JMS-FRUIT-001', heat='FRUIT'),
+            product('p4', 'Black Bean Corn Poblano', 'bean-corn', 'JMS-MED-001', heat='MEDIUM'),
+        ]
+        records = [
+            record('1', 'Original Hot', 'original-hot-2'),
+            record('2', 'Cherry Hot', 'cherry-hot'),
+            record('3', 'Roasted Garlic & Olives', 'roasted-garlic-olives', heat='FRUIT'),
+            record('4', 'Black Bean Corn Pablano', 'black-bean-corn', heat='MEDIUM'),
+        ]
+        plan = self.plan(records, products, self.registry({'1': 'JMS-HOT-001'}))
+        methods = {m['sourceId']: (m['productId'], m['method']) for m in plan['matches']}
+        self.assertEqual(methods, {
+            '1': ('p1', 'source_id'),
+            '2': ('p2', 'slug'),
+            '3': ('p3', 'name'),
+            '4': ('p4', 'fuzzy'),
+        })
+
+    def test_fuzzy_never_takes_a_row_matched_exactly(self):
+        products = [product('p1', 'Peach Mango Mild', 'peach-mango-mild', 'JMS-MILD-001', heat='MILD')]
+        records = [
+            record('1', 'Peach Mango Mild Chunky', 'peach-mango-mild-chunky', heat='MILD'),
+            record('2', 'Peach Mango Mild', 'peach-mango', heat='MILD'),
+        ]
+        plan = self.plan(records, products)
+        self.assertEqual([(m['sourceId'], m['method']) for m in plan['matches']], [('2', 'name')])
+        self.assertEqual([i['sourceId'] for i in plan['inserts']], ['1'])
+
+    def test_stale_source_id_mapping_is_ignored(self):
+        # Map entries written by the old seed generators pointed at unrelated rows
+        products = [
+            product('p1', 'Original Hot', 'original-hot', 'JMS-HOT-002'),
+            product('p2', 'Cherry Hot', 'cherry-hot', 'JMS-HOT-011'),
+            product('p3', 'Cherri Mild Salsa', 'cherri-mild-salsa', 'JMS-FRUIT-001', heat='FRUIT'),
+            product('p4', 'Green Apple', 'green-apple-salsa', 'JMS-FRUIT-007', heat='FRUIT'),
+        ]
+        records = [
+            record('11', 'Cherry Hot', 'cherry-hot'),
+            record('12', 'Green Apple', 'green-apple', heat='FRUIT'),
+        ]
+        registry = self.registry({'11': 'JMS-HOT-002', '12': 'JMS-FRUIT-001'})
+        plan = self.plan(records, products, registry)
+        matched = {m['sourceId']: (m['productId'], m['method']) for m in plan['matches']}
+        self.assertEqual(matched, {'11': ('p2', 'slug'), '12': ('p4', 'name')})
+
+        reconcile.record_skus(plan, registry)
+        self.assertEqual(registry.get('11'), 'JMS-HOT-011')
+        self.assertEqual(registry.get('12'), 'JMS-FRUIT-007')
+
+class ReviewTest(ReconcileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = [
+            product('jar', 'Peach Mango Mild Jar', 'peach-mango-mild-jar', 'JMS-MILD-001', heat='MILD'),
+            product('can', 'Peach Mango Mild Can', 'peach-mango-mild-can', 'JMS-MILD-002', heat='MILD'),
+            product('old', 'Discontinued Hot', 'discontinued-hot', 'JMS-HOT-001'),
+        ]
+        self.plan_ = self.plan([record('1', 'Peach Mango Mild', 'peach-mango-mild', heat='MILD')], self.products)
+
+    def test_name_extended_by_products_goes_to_review(self):
+        self.assertEqual(self.plan_['matches'], [])
+        self.assertEqual(self.plan_['inserts'], [])
+        [item] = self.plan_['review']
+        self.assertEqual(item['reason'], 'subset')
+        self.assertEqual({c['productId'] for c in item['candidates']}, {'jar', 'can'})
+
+    def test_ambiguous_fuzzy_match_goes_to_review(self):
+        products = [
+            product('a', 'Peach Mango Mlid', 'peach-mango-mlid', 'JMS-MILD-001', heat='MILD'),
+            product('b', 'Peach Mangoo Mild', 'peach-mangoo-mild', 'JMS-MILD-002', heat='MILD'),
+        ]
+        plan = self.plan([record('1', 'Peach Mango Mild', 'peach-mango-mild', heat='MILD')], products)
+        self.assertEqual(plan['matches'], [])
+        [item] = plan['review']
+        self.assertEqual(item['reason'], 'ambiguous')
+        self.assertEqual({c['productId'] for c in item['candidates']}, {'a', 'b'})
+
+    def test_new_flavor_extending_a_product_name_is_not_matched(self):
+        products = [product('p1', 'Cherry Hot', 'cherry-hot', 'JMS-HOT-011')]
+        records = [record('1', 'Cherry Chocolate Hot', 'cherry-chocolate-hot')]
+        plan = self.plan(records, products)
+        self.assertEqual(plan['matches'], [])
+        self.assertEqual(plan['inserts'], [])
+        self.assertEqual(plan['deactivations'], [])
+        [item] = plan['review']
+        self.assertEqual((item['reason'], item['candidates'][0]['productId']), ('subset', 'p1'))
+
+        # Nor is a map entry that already points the new flavor at the old row
+        plan = self.plan(records, products, self.registry({'1': 'JMS-HOT-011'}))
+        self.assertEqual(plan['matches'], [])
+
+    def test_review_candidates_are_not_deactivated(self):
+        self.assertEqual([d['productId'] for d in self.plan_['deactivations']], ['old'])
+
+    def test_insert_with_taken_slug_goes_to_review(self):
+        products = [product('p1', 'Cherry Hot', 'cherry-hot', 'JMS-HOT-001')]
+        records = [
+            record('1', 'Cherry Hot', 'cherry-hot'),
+            record('2', 'Black Cherry Habanero', 'cherry-hot'),
+            record('3', 'Mango Mild', 'mango-mild', heat='MILD'),
+            record('4', 'Lime Cilantro Mild', 'mango-mild', heat='MILD'),
+        ]
+        plan = self.plan(records, products)
+        self.assertEqual([i['sourceId'] for i in plan['inserts']], ['3'])
+        self.assertEqual([(i['sourceId'], i['reason']) for i in plan['review']],
+                         [('2', 'slug-taken'), ('4', 'slug-taken')])
+
+class DeactivationTest(ReconcileTestCase):
+    def test_only_unmatched_active_products_are_deactivated(self):
+        products = [
+            product('p1', 'Original Hot', 'original-hot', 'JMS-HOT-001'),
+            product('p2', 'Ghost of Clovis', 'ghost-of-clovis', 'JMS-XHOT-001', heat='EXTRA_HOT'),
+            product('p3', 'Old Batch', 'old-batch', 'JMS-HOT-002', active=False),
+        ]
+        plan = self.plan([record('1', 'Original Hot', 'original-hot')], products)
+        self.assertEqual([d['productId'] for d in plan['deactivations']], ['p2'])
+
+    def test_matched_inactive_product_is_reactivated(self):
+        products = [product('p1', 'Original Hot', 'original-hot', 'JMS-HOT-001', active=False)]
+        plan = self.plan([record('1', 'Original Hot', 'original-hot')], products)
+        self.assertEqual(plan['updates'], [
+            {'productId': 'p1', 'sku': 'JMS-HOT-001', 'changes': {'isActive': ['false', 'true']}},
+        ])
+
+class SkuMapTest(ReconcileTestCase):
+    def test_insert_skus_skip_database_skus(self):
+        products = [product('p1', 'Original Mild', 'original-mild', 'JMS-MILD-004', heat='MILD')]
+        records = [record('1', 'Mango Mild', 'mango-mild', heat='MILD')]
+        registry = self.registry()
+        plan = self.plan(records, products, registry)
+        self.assertEqual(plan['inserts'][0]['sku'], 'JMS-MILD-005')
+        self.assertIsNone(registry.get('1'))
+
+        reconcile.record_skus(plan, registry)
+        self.assertEqual(registry.get('1'), 'JMS-MILD-005')
+
+    def run_main(self, *args):
+        scraped = os.path.join(self.tmp.name, 'scraped.json')
+        with open(scraped, 'w') as f:
+            json.dump([
+                {'id': 1, 'name': 'Original Mild', 'slug': 'original-mild', 'price': 7.0, 'heat_level': 'MILD'},
+                {'id': 2, 'name': 'Mango Mild', 'slug': 'mango-mild', 'price': 7.0, 'heat_level': 'MILD'},
+            ], f)
+        argv = ['reconcile-products.py', '--scraped', scraped, '--plan', os.path.join(self.tmp.name, 'plan.json')]
+        products = [product('p1', 'Original Mild', 'original-mild', 'JMS-MILD-004', heat='MILD')]
+        with mock.patch.object(sys, 'argv', argv + list(args)), \
+                mock.patch.object(reconcile, 'load_products', return_value=products), \
+                mock.patch.object(reconcile, 'SkuRegistry', lambda: SkuRegistry(self.map_path)), \
+                mock.patch.object(reconcile, 'execute') as execute, \
+                mock.patch('builtins.print'):
+            reconcile.main()
+        return execute
+
+    def test_dry_run_does_not_write_the_map(self):
+        execute = self.run_main()
+        execute.assert_not_called()
+        self.assertFalse(os.path.exists(self.map_path))
+
+    def test_apply_writes_matches_and_inserts_to_the_map(self):
+        execute = self.run_main('--apply')
+        execute.assert_called_once()
+        with open(self.map_path) as f:
+            self.assertEqual(json.load(f), {'1': 'JMS-MILD-004', '2': 'JMS-MILD-005'})
+
+    def test_provisional_skus_are_not_mapped(self):
+        registry = self.registry({'95': 'JMS-MILD-001'})
+        self.assertEqual(registry.sku_or_provisional('95', 'MILD'), 'JMS-MILD-001')
+        self.assertEqual(registry.sku_or_provisional('96', 'HOT'), 'JMS-HOT-NEW-96')
+        self.assertIsNone(registry.get('96'))
+
+class BlockingTest(unittest.TestCase):
+    def test_common_tokens_are_blocked_by_pairs(self):
+        products = [
+            {'name': f'Mild Hot Flavor{i}', 'slug': f'a{i}', 'sku': f'A-{i}'} for i in range(10)
+        ] + [
+            {'name': f'Mild Garden{i}', 'slug': f'b{i}', 'sku': f'B-{i}'} for i in range(10)
+        ]
+        index = reconcile.ProductIndex(products, max_block=5)
+        self.assertEqual(index.block(normalize_name('Mild Garden3')), {13})
+        # "mild" and "hot" are common and so is the pair; nothing to compare against
+        self.assertEqual(index.block(normalize_name('Mild Hot')), set())
+
+class PlanScriptTest(unittest.TestCase):
+    def test_inserts_check_categories_first(self):
+        plan = {'updates': [], 'deactivations': [], 'inserts': [{
+            'sourceId': '1', 'name': 'Mango Mild', 'slug': 'mango-mild', 'sku': 'JMS-MILD-001',
+            'heatLevel': 'MILD', 'price': '7.00', 'description': '', 'image': None,
+        }]}
+        script = reconcile.plan_script(plan)
+        self.assertLess(script.index("RAISE EXCEPTION 'Missing product categories"), script.index('INSERT INTO products'))
+        self.assertIn("unnest(ARRAY['mild-salsa'])", script)
+
+if __name__ == '__main__':
+    unittest.main()
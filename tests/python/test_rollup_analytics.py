@@ -0,0 +1,77 @@
+"""
+Tests for scripts/rollup-analytics.py
+
+Run with: python3 -m pytest -q tests/python  (or python3 -m unittest discover tests/python)
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest import mock
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+_spec = importlib.util.spec_from_file_location('rollup_analytics', os.path.join(SCRIPTS_DIR, 'rollup-analytics.py'))
+rollup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rollup)
+
+HyperLogLog = rollup.HyperLogLog
+
+def sketch_of(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def assert_close(test, estimate, actual, tolerance=0.1):
+    test.assertLessEqual(abs(estimate - actual), actual * tolerance, f"estimate {estimate} for {actual}")
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_estimate_small_and_large_counts(self):
+        self.assertEqual(HyperLogLog().estimate(), 0)
+        for count in (50, 1000, 50000):
+            assert_close(self, sketch_of(f'session-{i}' for i in range(count)).estimate(), count)
+
+    def test_repeated_values_count_once(self):
+        sketch = sketch_of(f'session-{i % 100}' for i in range(10000))
+        assert_close(self, sketch.estimate(), 100)
+
+    def test_merge_counts_the_union(self):
+        a = sketch_of(f'session-{i}' for i in range(0, 6000))
+        b = sketch_of(f'session-{i}' for i in range(4000, 10000))
+        a.merge(b)
+        assert_close(self, a.estimate(), 10000)
+
+        # Merging gives the same registers as sketching every value once
+        self.assertEqual(bytes(a.registers), bytes(sketch_of(f'session-{i}' for i in range(10000)).registers))
+
+    def test_registers_round_trip_as_bytes(self):
+        sketch = sketch_of(f'session-{i}' for i in range(500))
+        self.assertEqual(HyperLogLog(bytes(sketch.registers)).estimate(), sketch.estimate())
+        with self.assertRaises(ValueError):
+            HyperLogLog(b'\x00' * 16)
+
+class AggregateTest(unittest.TestCase):
+    def test_sessions_only_sketched_on_all_pages_rows(self):
+        events = [
+            [f'e{i}', 'PAGE_VIEW', f'/products/{i % 3}', f's{i % 20}', f'2026-10-19 09:{i % 60:02d}:00']
+            for i in range(120)
+        ]
+        with mock.patch.object(rollup, 'stream_rows', return_value=iter([events])), \
+             mock.patch('builtins.print'):
+            rollups, last, processed = rollup.aggregate_new_events(None, '', datetime(2026, 10, 20), 1000)
+
+        self.assertEqual(processed, 120)
+        self.assertEqual(last, (datetime(2026, 10, 19, 9, 59), 'e119'))
+        all_pages = rollups[('DAILY', datetime(2026, 10, 19), 'PAGE_VIEW', rollup.ALL_PAGES)]
+        self.assertEqual(all_pages.events, 120)
+        self.assertEqual(all_pages.sketch.estimate(), 20)
+        page = rollups[('DAILY', datetime(2026, 10, 19), 'PAGE_VIEW', '/products/0')]
+        self.assertEqual(page.events, 40)
+        self.assertIsNone(page.sketch)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests for scripts/settlement-report.py
+
+Run with: python3 -m pytest -q tests/python  (or python3 -m unittest discover tests/python)
+"""
+
+import csv
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+_spec = importlib.util.spec_from_file_location('settlement_report', os.path.join(SCRIPTS_DIR, 'settlement-report.py'))
+settlement = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(settlement)
+
+FUNDRAISERS = {
+    'f1': {'name': 'Band Boosters', 'organization': 'Zanesville High', 'commissionRate': Decimal('10'),
+           'goal': Decimal('100'), 'startDate': '2026-09-01', 'endDate': '2026-12-31'},
+    'f2': {'name': 'Little League', 'organization': 'Muskingum', 'commissionRate': Decimal('15'),
+           'goal': None, 'startDate': '2026-09-01', 'endDate': '2026-12-31'},
+}
+
+def order_line(order_id, fid, product_id, total, quantity=1, created_at='2026-09-03 10:00:00'):
+    return [order_id, created_at, fid, None, product_id, f'Salsa {product_id}', str(quantity), total]
+
+def compute(lines, periods=('2026-09',), links=None):
+    with mock.patch.object(settlement, 'stream_rows', return_value=iter([lines])) as stream, \
+         mock.patch.object(settlement, 'fetch_rows', return_value=[]), \
+         mock.patch('builtins.print'):
+        reports = settlement.compute_periods(list(periods), FUNDRAISERS, links or {}, {}, 1000)
+    return reports, stream.call_args[0][0]
+
+class MoneyTest(unittest.TestCase):
+    def test_rounds_half_up_to_cents(self):
+        self.assertEqual(settlement.money(Decimal('0.125')), Decimal('0.13'))
+        self.assertEqual(settlement.money(Decimal('2.675')), Decimal('2.68'))
+        self.assertEqual(settlement.money(Decimal('2.674')), Decimal('2.67'))
+
+class PeriodsTest(unittest.TestCase):
+    def test_month_closes_after_grace(self):
+        grace = timedelta(days=7)
+        self.assertFalse(settlement.is_closed('2026-09', datetime(2026, 10, 7, 23, 59), grace))
+        self.assertTrue(settlement.is_closed('2026-09', datetime(2026, 10, 8), grace))
+        self.assertTrue(settlement.is_closed('2026-12', datetime(2027, 1, 1), timedelta(0)))
+
+    def test_only_requested_months_are_queried(self):
+        condition = settlement.in_periods('o."createdAt"', ['2026-07', '2025-12', '2026-01'])
+        self.assertEqual(condition, (
+            "((o.\"createdAt\" >= TIMESTAMP '2025-12-01 00:00:00' AND o.\"createdAt\" < TIMESTAMP '2026-02-01 00:00:00')"
+            " OR (o.\"createdAt\" >= TIMESTAMP '2026-07-01 00:00:00' AND o.\"createdAt\" < TIMESTAMP '2026-08-01 00:00:00'))"
+        ))
+
+class ComputePeriodsTest(unittest.TestCase):
+    def test_commission_only_on_linked_products(self):
+        lines = [
+            order_line('o1', 'f1', 'p1', '19.99'),
+            order_line('o1', 'f1', 'p2', '5.00'),
+            order_line('o2', 'f2', 'p2', '3.33', quantity=2),
+        ]
+        reports, query = compute(lines, links={'f1': {'p1'}})
+        self.assertIn('"status" NOT IN', query)
+        by_id = {f['fundraiserId']: f for f in reports['2026-09']['fundraisers']}
+
+        # f1 only earns on its linked product; f2 has no links, so every line counts
+        self.assertEqual(by_id['f1']['sales'], Decimal('24.99'))
+        self.assertEqual(by_id['f1']['commissionableSales'], Decimal('19.99'))
+        self.assertEqual(by_id['f1']['commission'], Decimal('2.00'))
+        self.assertEqual(by_id['f2']['commissionableSales'], Decimal('3.33'))
+        self.assertEqual(by_id['f2']['commission'], Decimal('0.50'))
+        self.assertEqual(reports['2026-09']['totals']['commissionOwed'], Decimal('2.50'))
+
+    def test_cached_report_round_trips(self):
+        reports, _ = compute([order_line('o1', 'f1', 'p1', '19.99')], links={'f1': {'p1'}})
+        report = reports['2026-09']
+        cached = settlement.from_json(json.loads(json.dumps(settlement.to_json(report))))
+        self.assertEqual(cached, report)
+        self.assertIsInstance(cached['fundraisers'][0]['commission'], Decimal)
+        self.assertEqual(str(cached['totals']['commissionOwed']), '2.00')
+
+class ExportTest(unittest.TestCase):
+    def test_campaign_totals_start_at_the_start_month(self):
+        def report(period, sales):
+            return {'period': period, 'closed': True, 'wholesale': [], 'fundraisers': [{
+                'fundraiserId': 'f1', 'name': 'Band Boosters', 'organization': 'Zanesville High',
+                'orders': 1, 'units': 1, 'sales': Decimal(sales), 'commissionableSales': Decimal(sales),
+                'commissionRate': Decimal('10'), 'commission': settlement.money(Decimal(sales) / 10),
+            }]}
+
+        campaign_reports = [report('2026-08', '40.00'), report('2026-09', '12.50')]
+        with tempfile.TemporaryDirectory() as output_dir:
+            settlement.export(campaign_reports[1:], campaign_reports, FUNDRAISERS, output_dir)
+            with open(os.path.join(output_dir, 'fundraiser-campaigns.csv'), newline='') as f:
+                rows = list(csv.DictReader(f))
+            with open(os.path.join(output_dir, 'fundraisers.csv'), newline='') as f:
+                monthly = list(csv.DictReader(f))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['sales'], '12.50')
+        self.assertEqual(rows[0]['commission'], '1.25')
+        self.assertEqual(rows[0]['goalProgressPercent'], '12.5')
+        self.assertEqual([r['period'] for r in monthly], ['2026-09'])
+
+if __name__ == '__main__':
+    unittest.main()